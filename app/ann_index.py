@@ -0,0 +1,281 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from embeddings import EmbeddingMatrix
+
+# Clusters probed per query: more means better recall and slower searches
+ANN_PROBE = int(os.environ.get('MEMORY_ANN_PROBE', 8))
+
+# Files of a saved index, inside its directory
+_CENTROIDS_FILE = 'centroids.npy'
+_VECTORS_FILE = 'vectors.npy'
+_OFFSETS_FILE = 'offsets.npy'
+_META_FILE = 'meta.json'
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    """Return float32 rows scaled to unit length (zero rows stay zero)"""
+    vectors = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def _nearest(centroids: np.ndarray, vectors: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    """Index of the most similar centroid of each row (by chunks, to bound the score matrix)"""
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk):
+        assignment[start:start + chunk] = np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+    return assignment
+
+
+class IVFIndex:
+    """
+    Approximate nearest-neighbour index over embeddings (inverted file, cosine similarity)
+
+    Vectors are clustered around centroids trained with spherical k-means; a query only
+    scans the clusters whose centroids are closest to it (`n_probe` of them).
+
+    Features:
+    - Vectors stored grouped by cluster, so each probed cluster is one contiguous read
+    - Saved as .npy files and loaded memory-mapped: only the probed clusters are paged in
+    - Incremental inserts kept in small per-cluster matrices until the next save
+    - Deletes as tombstones, dropped when the index is compacted
+    """
+
+    def __init__(self, centroids: np.ndarray, n_probe: int = ANN_PROBE):
+        self.centroids = _normalized(centroids)
+        self.dim = self.centroids.shape[1]
+        self.n_probe = n_probe
+        # Vectors grouped by cluster: cluster c is rows offsets[c]:offsets[c + 1]
+        self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._deleted = np.zeros(0, dtype=bool)
+        self._deleted_count = 0
+        # Inserted since the last compaction, by cluster
+        self._recent: Dict[int, EmbeddingMatrix] = {}
+        self._recent_cluster: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @staticmethod
+    def train(vectors: np.ndarray, n_lists: Optional[int] = None, iterations: int = 10,
+              sample_size: int = 50000, seed: int = 0) -> np.ndarray:
+        """
+        Cluster centroids of a set of vectors (spherical k-means on a sample)
+
+        Args:
+            vectors: Training vectors, one per row
+            n_lists: Number of clusters (default: 4 * sqrt(n), a common IVF setting)
+            iterations: k-means iterations
+            sample_size: Rows used for training
+            seed: Random seed of the sampling and initialization
+
+        Returns:
+            The unit-length centroids, one per row
+        """
+        if not len(vectors):
+            raise ValueError("Cannot train an index without vectors")
+        rng = np.random.default_rng(seed)
+        if n_lists is None:
+            n_lists = int(4 * np.sqrt(len(vectors)))
+        n_lists = max(1, min(n_lists, len(vectors)))
+
+        sample = vectors if len(vectors) <= sample_size else vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        sample = _normalized(sample)
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = _nearest(centroids, sample)
+            order = np.argsort(assignment, kind='stable')
+            counts = np.bincount(assignment, minlength=n_lists)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            filled = counts > 0
+            sums = np.add.reduceat(sample[order], starts[filled], axis=0)
+            centroids[filled] = _normalized(sums)
+            # Restart empty clusters from random points
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        return centroids
+
+    @classmethod
+    def build(cls, ids: Sequence[str], vectors: np.ndarray, n_lists: Optional[int] = None,
+              n_probe: int = ANN_PROBE) -> 'IVFIndex':
+        """Train centroids on the vectors and index them"""
+        vectors = _normalized(vectors)
+        index = cls(cls.train(vectors, n_lists), n_probe)
+        index._set_grouped(list(ids), vectors)
+        return index
+
+    def _set_grouped(self, ids: List[str], vectors: np.ndarray) -> None:
+        """Replace the indexed vectors, grouping them by nearest centroid"""
+        assignment = _nearest(self.centroids, vectors) if len(vectors) else np.zeros(0, dtype=np.int64)
+        order = np.argsort(assignment, kind='stable')
+        self._vectors = np.ascontiguousarray(vectors[order])
+        self._offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=self.n_lists)))).astype(np.int64)
+        self._ids = [ids[row] for row in order]
+        self._rows = {memory_id: row for row, memory_id in enumerate(self._ids)}
+        self._deleted = np.zeros(len(self._ids), dtype=bool)
+        self._deleted_count = 0
+        self._recent = {}
+        self._recent_cluster = {}
+
+    def __len__(self) -> int:
+        return len(self._ids) - self._deleted_count + len(self._recent_cluster)
+
+    def __contains__(self, memory_id: str) -> bool:
+        row = self._rows.get(memory_id)
+        return memory_id in self._recent_cluster or (row is not None and not self._deleted[row])
+
+    def ids(self) -> List[str]:
+        """Identifiers of every indexed vector"""
+        with self._lock:
+            grouped = [memory_id for row, memory_id in enumerate(self._ids) if not self._deleted[row]]
+            return grouped + list(self._recent_cluster)
+
+    def add(self, memory_id: str, vector: np.ndarray) -> None:
+        """Insert or replace a vector; it is assigned to the cluster of its nearest centroid"""
+        vector = _normalized(vector)[0]
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Embedding has dimension {vector.shape}, index expects {self.dim}")
+        cluster = int(np.argmax(self.centroids @ vector))
+
+        with self._lock:
+            self.remove(memory_id)
+            if cluster not in self._recent:
+                self._recent[cluster] = EmbeddingMatrix(self.dim, capacity=16)
+            self._recent[cluster].add(memory_id, vector)
+            self._recent_cluster[memory_id] = cluster
+
+    def remove(self, memory_id: str) -> bool:
+        """Remove a vector (a tombstone until the next compaction)"""
+        with self._lock:
+            cluster = self._recent_cluster.pop(memory_id, None)
+            if cluster is not None:
+                return self._recent[cluster].remove(memory_id)
+            row = self._rows.get(memory_id)
+            if row is None or self._deleted[row]:
+                return False
+            self._deleted[row] = True
+            self._deleted_count += 1
+            return True
+
+    def pending_changes(self) -> int:
+        """Inserts and deletes not merged into the grouped vectors yet"""
+        return len(self._recent_cluster) + self._deleted_count
+
+    def compact(self) -> None:
+        """Merge recent inserts into the grouped vectors and drop deleted ones"""
+        with self._lock:
+            keep = np.flatnonzero(~self._deleted)
+            ids = [self._ids[row] for row in keep]
+            parts = [np.asarray(self._vectors[keep])]
+            for cluster, matrix in self._recent.items():
+                recent = [memory_id for memory_id, c in self._recent_cluster.items() if c == cluster]
+                if recent:
+                    ids.extend(recent)
+                    parts.append(np.stack([matrix.vector(memory_id) for memory_id in recent]))
+            self._set_grouped(ids, np.concatenate(parts) if ids else np.zeros((0, self.dim), dtype=np.float32))
+
+    def search(self, vector: np.ndarray, k: int, min_score: float = -1.0,
+               n_probe: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Return up to k (id, cosine similarity) pairs among the clusters nearest to the query, most similar first"""
+        query = _normalized(vector)[0]
+        if query.shape != (self.dim,):
+            raise ValueError(f"Query has dimension {query.shape}, index expects {self.dim}")
+        if k <= 0 or not query.any():
+            return []
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        clusters = np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]
+
+        with self._lock:
+            scores, rows = [], []
+            for cluster in clusters:
+                start, end = self._offsets[cluster], self._offsets[cluster + 1]
+                if end > start:
+                    cluster_scores = self._vectors[start:end] @ query
+                    cluster_scores[self._deleted[start:end]] = -np.inf
+                    scores.append(cluster_scores)
+                    rows.append(np.arange(start, end))
+
+            hits: List[Tuple[str, float]] = []
+            if scores:
+                scores, rows = np.concatenate(scores), np.concatenate(rows)
+                top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+                hits = [(self._ids[rows[i]], float(scores[i])) for i in top if scores[i] >= min_score]
+            for cluster in clusters:
+                if int(cluster) in self._recent:
+                    hits.extend(self._recent[int(cluster)].search(query, k, min_score))
+
+        hits.sort(key=lambda hit: hit[1], reverse=True)
+        return hits[:k]
+
+    def save(self, path: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Compact the index and write it to a directory (each file replaced atomically)
+
+        Args:
+            path: Directory of the index
+            meta: Extra information stored with it (e.g. the embedding model)
+        """
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            self.compact()
+            centroids, vectors, offsets, ids = self.centroids, self._vectors, self._offsets, list(self._ids)
+
+        # Vectors first and metadata last: a reader never sees ids without their vectors
+        for name, array in ((_VECTORS_FILE, vectors), (_CENTROIDS_FILE, centroids), (_OFFSETS_FILE, offsets)):
+            tmp_path = os.path.join(path, f"{name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp_path, os.path.join(path, name))
+        tmp_path = os.path.join(path, f"{_META_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta or {}, 'n_probe': self.n_probe, 'ids': ids}, f)
+        os.replace(tmp_path, os.path.join(path, _META_FILE))
+
+        # Serve the saved copy through mmap instead of keeping the compacted vectors in memory
+        with self._lock:
+            if self._vectors is vectors:
+                self._vectors = np.load(os.path.join(path, _VECTORS_FILE), mmap_mode='r')
+        logging.info(f"ANN index saved to {path}: {len(ids)} vectors in {self.n_lists} clusters")
+
+    @classmethod
+    def load(cls, path: str, n_probe: Optional[int] = None) -> Tuple[Optional['IVFIndex'], Dict[str, Any]]:
+        """
+        Open a saved index, memory-mapping its vectors
+
+        Returns:
+            (index, meta), or (None, {}) if there is no usable index at this path
+        """
+        try:
+            with open(os.path.join(path, _META_FILE), 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            centroids = np.load(os.path.join(path, _CENTROIDS_FILE))
+            offsets = np.load(os.path.join(path, _OFFSETS_FILE))
+            vectors = np.load(os.path.join(path, _VECTORS_FILE), mmap_mode='r')
+        except (OSError, ValueError) as e:
+            logging.info(f"No ANN index loaded from {path}: {e}")
+            return None, {}
+        if len(vectors) != len(saved['ids']) or len(offsets) != len(centroids) + 1:
+            logging.warning(f"ANN index at {path} is inconsistent, ignoring it")
+            return None, {}
+
+        index = cls(centroids, n_probe or saved.get('n_probe', ANN_PROBE))
+        index._vectors = vectors
+        index._offsets = offsets
+        index._ids = saved['ids']
+        index._rows = {memory_id: row for row, memory_id in enumerate(index._ids)}
+        index._deleted = np.zeros(len(index._ids), dtype=bool)
+        return index, saved.get('meta', {})
@@ -0,0 +1,98 @@
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Union
+
+# Characters decoded per chunk (multiple of 4, so chunks hold whole base64 groups)
+BASE64_CHUNK_CHARS = 4 * 1024 * 1024
+
+# Anything that is not part of the base64 alphabet (newlines, spaces) is skipped, like b64decode does
+_NON_BASE64 = re.compile(r'[^A-Za-z0-9+/=]')
+
+
+@dataclass
+class Artifact:
+    """A file written for a creation"""
+    path: str
+    size: int
+    sha256: str
+
+
+class _AtomicWriter:
+    """Write a file through a temporary sibling, hashing every chunk; renamed into place on success"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.file = None
+
+    def __enter__(self) -> '_AtomicWriter':
+        self.file = open(self.tmp_path, 'wb')
+        return self
+
+    def write(self, chunk: Union[bytes, memoryview]):
+        self.hash.update(chunk)
+        self.file.write(chunk)
+        self.size += len(chunk)
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            try:
+                os.remove(self.tmp_path)
+            except OSError:
+                pass
+        return False
+
+    def artifact(self) -> Artifact:
+        return Artifact(self.path, self.size, self.hash.hexdigest())
+
+
+def write_bytes(path: str, data: bytes, chunk_size: int = 1024 * 1024) -> Artifact:
+    """Write bytes atomically, hashing them on the way"""
+    view = memoryview(data)
+    with _AtomicWriter(path) as writer:
+        for start in range(0, len(view), chunk_size):
+            writer.write(view[start:start + chunk_size])
+    return writer.artifact()
+
+
+def write_base64(path: str, encoded: str, chunk_chars: int = BASE64_CHUNK_CHARS) -> Artifact:
+    """
+    Decode a base64 string straight to a file, one chunk at a time
+
+    Only one decoded chunk is held in memory instead of the whole payload. Raises
+    binascii.Error if the string is not valid base64 (nothing is written then).
+    """
+    with _AtomicWriter(path) as writer:
+        carry = ''
+        for start in range(0, len(encoded), chunk_chars):
+            piece = carry + encoded[start:start + chunk_chars]
+            if _NON_BASE64.search(piece):
+                piece = _NON_BASE64.sub('', piece)
+            # Keep an incomplete 4-character group for the next chunk
+            usable = len(piece) - len(piece) % 4
+            writer.write(base64.b64decode(piece[:usable]))
+            carry = piece[usable:]
+        if carry:
+            raise binascii.Error(f"Truncated base64 data ({len(carry)} trailing characters)")
+    return writer.artifact()
+
+
+def write_model(path: str, model_data: Union[str, bytes]) -> Artifact:
+    """Save the generated 3D model: base64 strings are decoded while writing, raw bytes are written as-is"""
+    if isinstance(model_data, str):
+        try:
+            return write_base64(path, model_data)
+        except (binascii.Error, ValueError) as decode_error:
+            logging.warning(f"Could not decode model data as base64: {decode_error}")
+            return write_bytes(path, model_data.encode())
+    return write_bytes(path, model_data)
@@ -0,0 +1,18 @@
+import argparse
+import logging
+
+from embeddings import embedder
+from memory_system import memory_system
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute the prompt embeddings of memories stored without one")
+    parser.add_argument("--batch-size", type=int, default=32, help="Memories embedded per database transaction")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum memories to embed (default: all)")
+    args = parser.parse_args()
+    
+    embedded = memory_system.backfill_embeddings(args.batch_size, args.limit)
+    print(f"Embedded {embedded} memories with '{embedder.model}'")
@@ -0,0 +1,157 @@
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List
+
+from main import execute, LocalAppModel
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def read_prompts(path: str) -> List[Dict[str, str]]:
+    """Read prompts from a JSONL file ({"prompt": ..., "id": optional}) or a CSV file with a 'prompt' column"""
+    prompts = []
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        
+        for index, row in enumerate(rows):
+            if isinstance(row, str):
+                row = {'prompt': row}
+            prompt = (row.get('prompt') or '').strip()
+            if not prompt:
+                logger.warning(f"Skipping entry {index}: no prompt")
+                continue
+            # Stable ID so an interrupted batch can be resumed
+            prompt_id = str(row.get('id') or hashlib.sha1(f"{index}:{prompt}".encode()).hexdigest()[:12])
+            prompts.append({'id': prompt_id, 'prompt': prompt})
+    
+    return prompts
+
+
+def load_finished(summary_path: str, retry_failed: bool) -> Dict[str, Dict[str, Any]]:
+    """Load the results already recorded in the summary file, keyed by prompt ID"""
+    finished = {}
+    if not os.path.exists(summary_path):
+        return finished
+    
+    with open(summary_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if retry_failed and record.get('status') == 'failed':
+                finished.pop(record['id'], None)
+            else:
+                finished[record['id']] = record
+    
+    return finished
+
+
+def run_prompt(entry: Dict[str, str]) -> Dict[str, Any]:
+    """Run the pipeline for one prompt and describe its outcome"""
+    model = LocalAppModel(entry['prompt'])
+    started = time.monotonic()
+    
+    try:
+        execute(model)
+    except Exception as e:
+        logger.error(f"[{entry['id']}] Pipeline raised: {e}")
+    
+    outcome = model.outcome
+    if outcome.get('reused_from'):
+        status = 'reused'
+    elif outcome.get('model_path'):
+        status = 'success'
+    elif outcome.get('image_path'):
+        status = 'image_only'
+    else:
+        status = 'failed'
+    
+    return {
+        'id': entry['id'],
+        'prompt': entry['prompt'],
+        'status': status,
+        'latency_seconds': round(time.monotonic() - started, 3),
+        'memory_id': outcome.get('memory_id'),
+        'image_path': outcome.get('image_path'),
+        'model_path': outcome.get('model_path'),
+        'message': model.response.message,
+        'finished_at': datetime.now().isoformat()
+    }
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate outcome counts and latency of the batch"""
+    latencies = [r['latency_seconds'] for r in records]
+    statuses: Dict[str, int] = {}
+    for record in records:
+        statuses[record['status']] = statuses.get(record['status'], 0) + 1
+    
+    return {
+        'total': len(records),
+        'statuses': statuses,
+        'latency_p50': percentile(latencies, 0.50),
+        'latency_p95': percentile(latencies, 0.95),
+        'latency_max': max(latencies) if latencies else 0.0
+    }
+
+
+def run_batch(input_path: str, summary_path: str, concurrency: int = 1, retry_failed: bool = False) -> Dict[str, Any]:
+    """Run every prompt not finished yet, appending each result to the summary file as it completes"""
+    prompts = read_prompts(input_path)
+    finished = load_finished(summary_path, retry_failed)
+    todo = [entry for entry in prompts if entry['id'] not in finished]
+    logger.info(f"{len(prompts)} prompts, {len(prompts) - len(todo)} already done, running {len(todo)} with concurrency {concurrency}")
+    
+    records = [finished[entry['id']] for entry in prompts if entry['id'] in finished]
+    write_lock = threading.Lock()
+    started = time.monotonic()
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_prompt, entry) for entry in todo]
+        for future in as_completed(futures):
+            record = future.result()
+            with write_lock:
+                with open(summary_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + '\n')
+                records.append(record)
+            logger.info(f"[{record['id']}] {record['status']} in {record['latency_seconds']}s ({len(records)}/{len(prompts)})")
+    
+    summary = summarize(records)
+    summary['wall_seconds'] = round(time.monotonic() - started, 3)
+    with open(f"{os.path.splitext(summary_path)[0]}.summary.json", 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the creative pipeline over a JSONL or CSV file of prompts")
+    parser.add_argument("input", help="JSONL file with a 'prompt' per line, or CSV file with a 'prompt' column")
+    parser.add_argument("--summary", default="batch_results.jsonl", help="Per-prompt results (JSONL); also used to resume")
+    parser.add_argument("--concurrency", type=int, default=int(os.environ.get('BATCH_CONCURRENCY', 2)), help="Pipelines run at the same time")
+    parser.add_argument("--retry-failed", action="store_true", help="Run again the prompts recorded as failed")
+    args = parser.parse_args()
+    
+    summary = run_batch(args.input, args.summary, args.concurrency, args.retry_failed)
+    print(json.dumps(summary, indent=2))
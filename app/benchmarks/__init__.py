@@ -0,0 +1 @@
+"""Offline benchmarks of the creative pipeline against local Ollama and Openfabric stand-ins"""
@@ -0,0 +1,141 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from ann_index import IVFIndex
+from embeddings import EmbeddingMatrix
+
+logger = logging.getLogger(__name__)
+
+
+def synthetic_embeddings(size: int, dim: int, queries: int, clusters: int, noise: float,
+                         seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Clustered random vectors (prompt embeddings group by theme) and queries drawn like them"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, size)] + noise * rng.normal(size=(size, dim)).astype(np.float32)
+    probes = centers[rng.integers(0, clusters, queries)] + noise * rng.normal(size=(queries, dim)).astype(np.float32)
+    return vectors, probes
+
+
+def stored_embeddings(db_path: str, queries: int, noise: float, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Embeddings of a memory database, with queries made by perturbing stored ones"""
+    with sqlite3.connect(db_path) as conn:
+        blobs = [row[0] for row in conn.execute("SELECT vector FROM memory_embeddings")]
+    if not blobs:
+        raise SystemExit(f"No embeddings in {db_path} (run backfill_embeddings.py first)")
+    dim = len(blobs[0]) // 4
+    vectors = np.frombuffer(b''.join(blob for blob in blobs if len(blob) == dim * 4), dtype='<f4').reshape(-1, dim)
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.integers(0, len(vectors), queries)]
+    scale = noise * np.linalg.norm(picked, axis=1, keepdims=True) / np.sqrt(dim)
+    return vectors, picked + scale * rng.normal(size=picked.shape).astype(np.float32)
+
+
+def timed_search(search, queries: np.ndarray) -> Tuple[List[List[str]], List[float]]:
+    """Run a search function over the queries, returning the hit ids and latencies (ms)"""
+    results, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits = search(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append([memory_id for memory_id, _ in hits])
+    return results, latencies
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    return {
+        'p50_ms': round(float(np.percentile(latencies, 50)), 4),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 4),
+        'mean_ms': round(float(np.mean(latencies)), 4)
+    }
+
+
+def run_benchmark(vectors: np.ndarray, queries: np.ndarray, k: int, probes: List[int],
+                  n_lists: int = None) -> Dict[str, Any]:
+    """Compare IVF search at several probe counts with exact search (recall@k and latency)"""
+    ids = [f"m{row}" for row in range(len(vectors))]
+
+    exact = EmbeddingMatrix.from_rows(ids, [vector.astype('<f4').tobytes() for vector in vectors])
+    truth, exact_latencies = timed_search(lambda query: exact.search(query, k), queries)
+
+    started = time.perf_counter()
+    index = IVFIndex.build(ids, vectors, n_lists)
+    build_seconds = time.perf_counter() - started
+
+    report: Dict[str, Any] = {
+        'size': len(vectors),
+        'dim': vectors.shape[1],
+        'queries': len(queries),
+        'k': k,
+        'n_lists': index.n_lists,
+        'build_seconds': round(build_seconds, 3),
+        'exact': latency_summary(exact_latencies)
+    }
+
+    # Search the saved copy, as the pipeline does after a restart
+    with tempfile.TemporaryDirectory(prefix="ann-bench-") as path:
+        started = time.perf_counter()
+        index.save(path)
+        report['save_seconds'] = round(time.perf_counter() - started, 3)
+        started = time.perf_counter()
+        loaded, _ = IVFIndex.load(path)
+        report['load_seconds'] = round(time.perf_counter() - started, 3)
+
+        report['ivf'] = []
+        for n_probe in probes:
+            found, latencies = timed_search(lambda query, n_probe=n_probe: loaded.search(query, k, n_probe=n_probe),
+                                            queries)
+            recall = np.mean([len(set(hits) & set(expected)) / max(len(expected), 1)
+                              for hits, expected in zip(found, truth)])
+            summary = latency_summary(latencies)
+            report['ivf'].append({
+                'n_probe': n_probe,
+                f'recall_at_{k}': round(float(recall), 4),
+                **summary,
+                'speedup': round(report['exact']['p50_ms'] / max(summary['p50_ms'], 1e-9), 1)
+            })
+            logger.info(f"n_probe={n_probe}: recall@{k} {recall:.3f}, p50 {summary['p50_ms']:.3f} ms")
+        # Release the memory-mapped files before the directory is removed
+        del loaded
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure recall and latency of the IVF memory index against exact search")
+    parser.add_argument("--size", type=int, default=100000, help="Synthetic embeddings indexed")
+    parser.add_argument("--dim", type=int, default=768, help="Dimension of the synthetic embeddings")
+    parser.add_argument("--clusters", type=int, default=500, help="Themes the synthetic embeddings are grouped in")
+    parser.add_argument("--noise", type=float, default=0.6, help="Spread of the embeddings around their theme")
+    parser.add_argument("--db", default=None, help="Use the embeddings of this memory database instead of synthetic ones")
+    parser.add_argument("--queries", type=int, default=200, help="Queries measured")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours retrieved per query")
+    parser.add_argument("--probes", default="1,2,4,8,16,32", help="Comma separated probe counts")
+    parser.add_argument("--lists", type=int, default=None, help="Clusters of the index (default: 4 * sqrt(size))")
+    parser.add_argument("--seed", type=int, default=1234, help="Seed of the synthetic data")
+    parser.add_argument("--output", default=None, help="Write the report (JSON) to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.db:
+        vectors, queries = stored_embeddings(args.db, args.queries, args.noise, args.seed)
+    else:
+        vectors, queries = synthetic_embeddings(args.size, args.dim, args.queries, args.clusters, args.noise, args.seed)
+
+    report = run_benchmark(vectors, queries, args.k, [int(p) for p in args.probes.split(',')], args.lists)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Optional
+
+from benchmarks.local_server import LocalServer
+
+# Words streamed back by the fake model, one per token
+WORDS = ("castle", "stone", "tower", "ancient", "glowing", "sunset", "detailed", "misty",
+         "forest", "golden", "light", "river", "mountain", "cinematic", "texture", "shadow")
+
+
+class FakeOllama:
+    """
+    Stand-in for the Ollama server answering `/api/generate` locally
+    
+    - Streams NDJSON chunks like Ollama, one word per token
+    - Configurable latency before the first token and between tokens
+    - Configurable failure rate (HTTP 500)
+    - Answers `format: "json"` requests with keywords and an expanded prompt
+    - Answers `/api/embeddings` with hashed bag-of-words vectors (prompts sharing words are similar)
+    """
+    
+    def __init__(self,
+                 first_token_latency: float = 0.05,
+                 token_delay: float = 0.002,
+                 failure_rate: float = 0.0,
+                 seed: Optional[int] = None,
+                 embedding_dim: int = 64,
+                 host: str = '127.0.0.1',
+                 port: int = 0):
+        self.first_token_latency = first_token_latency
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.embedding_dim = embedding_dim
+        self.requests = 0
+        self.server = LocalServer(self._handler(), host, port)
+    
+    @property
+    def url(self) -> str:
+        return self.server.url
+    
+    def start(self) -> 'FakeOllama':
+        self.server.start("fake-ollama")
+        return self
+    
+    def stop(self) -> None:
+        self.server.stop()
+    
+    def answer(self, payload: dict) -> list:
+        """Tokens of the answer to a generate request"""
+        tokens = payload.get('options', {}).get('num_predict') or 80
+        words = [self.random.choice(WORDS) for _ in range(min(tokens, 80))]
+        if payload.get('format') == 'json':
+            text = json.dumps({"keywords": words[:4], "expanded_prompt": " ".join(words[:50])})
+            return [text[i:i + 8] for i in range(0, len(text), 8)]
+        if tokens <= 64:
+            # Keyword-sized answers look like a comma separated list
+            return [f"{word}, " for word in words[:5]]
+        return [f"{word} " for word in words]
+    
+    def embedding(self, text: str) -> list:
+        """Deterministic embedding: the sum of a pseudo-random direction per word"""
+        vector = [0.0] * self.embedding_dim
+        for word in text.lower().split():
+            word_random = random.Random(hashlib.sha256(word.encode()).digest())
+            for i in range(self.embedding_dim):
+                vector[i] += word_random.gauss(0.0, 1.0)
+        return vector
+    
+    def _handler(self):
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_POST(self):
+                if self.path not in ('/api/generate', '/api/embeddings'):
+                    self.send_error(404)
+                    return
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                fake.requests += 1
+                
+                if self.path == '/api/embeddings':
+                    body = json.dumps({"embedding": fake.embedding(payload.get('prompt', ''))}).encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                
+                if fake.random.random() < fake.failure_rate:
+                    self.send_error(500, "Injected failure")
+                    return
+                
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                
+                # Warm-up requests (no prompt) only load the model
+                tokens = fake.answer(payload) if payload.get('prompt') else []
+                time.sleep(fake.first_token_latency)
+                try:
+                    for token in tokens:
+                        self._chunk({"response": token, "done": False})
+                        time.sleep(fake.token_delay)
+                    self._chunk({"response": "", "done": True})
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading early (word limit or stop delimiter)
+                    self.close_connection = True
+            
+            def _chunk(self, data: dict) -> None:
+                line = (json.dumps(data) + "\n").encode('utf-8')
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
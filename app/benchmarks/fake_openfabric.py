@@ -0,0 +1,227 @@
+import base64
+import io
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from typing import Iterable, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from PIL import Image
+
+from benchmarks.local_server import LocalServer
+from core.remote import Remote
+
+# Output field holding a resource reference, resolved by the Stub through the resource endpoint
+RESOURCE_FIELD = {"type": "string", "format": "resource"}
+
+
+class FakeOpenfabric:
+    """
+    Stand-in for Openfabric apps, serving every app ID under its own path prefix
+    (`/<app_id>/manifest`, `/<app_id>/schema`, `/<app_id>/execute`, `/<app_id>/resource`)
+    
+    - Text-to-image apps answer with a resource reference to a PNG image
+    - Every other app behaves like an image-to-3D app and answers with a base64 model
+    - Configurable latency and failure rate for each kind of app
+    """
+    
+    def __init__(self,
+                 text_to_image_ids: Iterable[str],
+                 image_latency: float = 0.2,
+                 model_latency: float = 0.5,
+                 failure_rate: float = 0.0,
+                 image_size: int = 1024,
+                 model_bytes: int = 2 * 1024 * 1024,
+                 seed: Optional[int] = None,
+                 host: str = '127.0.0.1',
+                 port: int = 0):
+        self.text_to_image_ids = set(text_to_image_ids)
+        self.image_latency = image_latency
+        self.model_latency = model_latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.resources = {}
+        self.lock = threading.Lock()
+        
+        # Noise compresses poorly, so the PNG has a realistic size
+        png = io.BytesIO()
+        Image.effect_noise((image_size, image_size), 64).convert('RGB').save(png, format='PNG')
+        self.image = png.getvalue()
+        self.model = base64.b64encode(os.urandom(model_bytes)).decode('ascii')
+        
+        self.server = LocalServer(self._handler(), host, port)
+    
+    @property
+    def url(self) -> str:
+        return self.server.url
+    
+    @property
+    def url_template(self) -> str:
+        """Stub URL template routing every app ID to this server"""
+        return f"{self.url}/{{app_id}}"
+    
+    def start(self) -> 'FakeOpenfabric':
+        self.server.start("fake-openfabric")
+        return self
+    
+    def stop(self) -> None:
+        self.server.stop()
+    
+    def schema(self, app_id: str, type: str) -> dict:
+        if type == 'input':
+            if app_id in self.text_to_image_ids:
+                return {"type": "object", "properties": {"prompt": {"type": "string"}}}
+            return {"type": "object", "properties": {"input_image": {"type": "string"}}}
+        if app_id in self.text_to_image_ids:
+            return {"type": "object", "properties": {"result": RESOURCE_FIELD}}
+        return {"type": "object", "properties": {"generated_object": {"type": "string"}, "video_object": {"type": "string"}}}
+    
+    def run(self, app_id: str, data: dict) -> dict:
+        """Executes a request, returning the proxy-style {status, data} answer"""
+        with self.lock:
+            self.requests += 1
+            failed = self.random.random() < self.failure_rate
+        
+        if app_id in self.text_to_image_ids:
+            time.sleep(self.image_latency)
+            if failed:
+                return {"status": "failed", "data": None}
+            reid = uuid.uuid4().hex
+            with self.lock:
+                self.resources[reid] = self.image
+            return {"status": "completed", "data": {"result": reid}}
+        
+        time.sleep(self.model_latency)
+        if failed:
+            return {"status": "failed", "data": None}
+        return {"status": "completed", "data": {"generated_object": self.model, "video_object": None}}
+    
+    def _handler(self):
+        fake = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_GET(self):
+                url = urlparse(self.path)
+                app_id, _, endpoint = url.path.strip('/').partition('/')
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                
+                if endpoint == 'manifest':
+                    self._json({"name": app_id, "version": "1.0"})
+                elif endpoint == 'schema':
+                    self._json(fake.schema(app_id, query.get('type', 'input')))
+                elif endpoint == 'resource':
+                    with fake.lock:
+                        body = fake.resources.pop(query.get('reid', ''), None)
+                    if body is None:
+                        self.send_error(404)
+                        return
+                    self._send(body, 'image/png')
+                else:
+                    self.send_error(404)
+            
+            def do_POST(self):
+                app_id, _, endpoint = urlparse(self.path).path.strip('/').partition('/')
+                if endpoint != 'execute':
+                    self.send_error(404)
+                    return
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                self._json(fake.run(app_id, payload.get('data') or {}))
+            
+            def _json(self, data) -> None:
+                self._send(json.dumps(data).encode('utf-8'), 'application/json')
+            
+            def _send(self, body: bytes, content_type: str) -> None:
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+
+
+class FakeExecution:
+    """
+    Pending request to a FakeOpenfabric app, exposing the ExecutionResult methods the Remote poller reads
+    """
+    
+    def __init__(self, future: Future):
+        self.future = future
+    
+    def status(self) -> str:
+        if self.future.cancelled():
+            return "CANCELLED"
+        if not self.future.done():
+            return "RUNNING"
+        if self.future.exception() is not None:
+            return "FAILED"
+        return self.future.result().get('status', 'failed').upper()
+    
+    def data(self) -> Optional[dict]:
+        return self.future.result().get('data') if self.status() == "COMPLETED" else None
+    
+    def cancel(self) -> None:
+        self.future.cancel()
+    
+    def request_qid(self) -> Optional[str]:
+        return None
+    
+    def progress(self, name: str = "default"):
+        return None
+    
+    def messages(self) -> list:
+        return []
+
+
+class FakeRemote(Remote):
+    """
+    Connection to a FakeOpenfabric app over plain HTTP instead of the proxy WebSocket
+    
+    Created by the Stub from the app's WebSocket URL (`ws://<server>/<app_id>/app`). Requests run
+    on a small thread pool standing in for the app; responses go through the regular Remote poller.
+    """
+    
+    executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="fake-remote")
+    
+    def __init__(self, proxy_url: str, proxy_tag: Optional[str] = None, timeout: float = 300):
+        super().__init__(proxy_url, proxy_tag)
+        self.base_url = 'http' + proxy_url[len('ws'):].rsplit('/app', 1)[0]
+        self.timeout = timeout
+        self.session: Optional[requests.Session] = None
+    
+    def connect(self) -> 'FakeRemote':
+        self.session = requests.Session()
+        return self
+    
+    def is_connected(self) -> bool:
+        return self.session is not None
+    
+    def disconnect(self) -> None:
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+    
+    def execute(self, inputs: dict, uid: str) -> Optional[FakeExecution]:
+        if self.session is None:
+            return None
+        return FakeExecution(self.executor.submit(self._post, self.session, inputs, uid))
+    
+    def execute_sync(self, inputs: dict, configs: dict, uid: str) -> Optional[dict]:
+        return self.get_response(self.execute(inputs, uid))
+    
+    def _post(self, session: requests.Session, inputs: dict, uid: str) -> dict:
+        response = session.post(f"{self.base_url}/execute", json={"data": inputs, "uid": uid}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
@@ -0,0 +1,36 @@
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Type
+
+
+class LocalServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server run in the background by the fake services
+    
+    Clients that hang up early (e.g. a stream closed at the word limit) are not reported as errors.
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, handler: Type[BaseHTTPRequestHandler], host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), handler)
+        self.thread: Optional[threading.Thread] = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self, name: str) -> None:
+        self.thread = threading.Thread(target=self.serve_forever, name=name, daemon=True)
+        self.thread.start()
+    
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+    
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
@@ -0,0 +1,213 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.fake_openfabric import FakeOpenfabric, FakeRemote
+
+logger = logging.getLogger(__name__)
+
+# Text-to-image app called by main.execute; every other app ID is served as an image-to-3D app
+TEXT_TO_IMAGE_ID = "c25dcd829d134ea98f5ae4dd311d13bc.node3.openfabric.network"
+
+
+class PeakMemory:
+    """Samples the resident set size of the process in the background and keeps the peak"""
+    
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="peak-memory", daemon=True)
+    
+    @staticmethod
+    def rss() -> int:
+        """Current resident set size in bytes (Linux), or the lifetime peak elsewhere"""
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.rss())
+            self._stop.wait(self.interval)
+    
+    def __enter__(self) -> 'PeakMemory':
+        self.peak = self.rss()
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+
+def run_level(concurrency: int, runs: int, offset: int) -> Dict[str, Any]:
+    """Run `runs` pipelines with `concurrency` at a time and aggregate their latency, throughput and memory"""
+    from batch import percentile, run_prompt
+    from memory_system import memory_system
+    
+    # Distinct prompts so neither the LLM cache nor memory reuse short-circuit a run
+    entries = [{'id': f"bench-{offset + i}", 'prompt': f"benchmark scene number {offset + i} with a stone castle"}
+               for i in range(runs)]
+    
+    with PeakMemory() as memory:
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            records = list(executor.map(run_prompt, entries))
+        wall = time.monotonic() - started
+    
+    latencies = [record['latency_seconds'] for record in records]
+    statuses: Dict[str, int] = {}
+    stages: Dict[str, List[float]] = {}
+    for record in records:
+        statuses[record['status']] = statuses.get(record['status'], 0) + 1
+        memory_entry = memory_system.recall_memory(record['memory_id']) if record['memory_id'] else None
+        for stage, seconds in (memory_entry.metadata.get('stage_durations', {}) if memory_entry else {}).items():
+            stages.setdefault(stage, []).append(seconds)
+    
+    return {
+        'concurrency': concurrency,
+        'runs': runs,
+        'statuses': statuses,
+        'wall_seconds': round(wall, 3),
+        'throughput_per_second': round(runs / wall, 3) if wall else 0.0,
+        'latency_p50': percentile(latencies, 0.50),
+        'latency_p95': percentile(latencies, 0.95),
+        'latency_p99': percentile(latencies, 0.99),
+        'peak_rss_mb': round(memory.peak / (1024 * 1024), 1),
+        'stage_p50': {stage: percentile(values, 0.50) for stage, values in sorted(stages.items())}
+    }
+
+
+def run_benchmark(concurrency_levels: List[int], runs: int, warmup: int,
+                  llm_latency: float, token_delay: float, image_latency: float, model_latency: float,
+                  failure_rate: float, seed: int, workdir: Optional[str] = None) -> Dict[str, Any]:
+    """Start the fake services, point the pipeline at them and run every concurrency level"""
+    fake_ollama = FakeOllama(llm_latency, token_delay, failure_rate, seed).start()
+    fake_openfabric = FakeOpenfabric([TEXT_TO_IMAGE_ID], image_latency, model_latency, failure_rate, seed=seed).start()
+    workdir = workdir or tempfile.mkdtemp(prefix="pipeline-bench-")
+    
+    # The pipeline reads its configuration at import time and writes relative to the working directory
+    os.environ.update({
+        'OLLAMA_BASE_URL': fake_ollama.url,
+        'OPENFABRIC_URL_TEMPLATE': fake_openfabric.url_template,
+        'LLM_CACHE_PATH': os.path.join(workdir, 'llm_cache.db'),
+        'BACKEND_SCOREBOARD_PATH': os.path.join(workdir, 'backend_scores.json'),
+    })
+    os.chdir(workdir)
+    
+    from core.stub import configure_shared_stub
+    configure_shared_stub(url_template=fake_openfabric.url_template, remote_factory=FakeRemote)
+    
+    try:
+        if warmup:
+            # Connects the apps and loads the modules, so the first level is not penalized
+            run_level(1, warmup, offset=0)
+        
+        levels = []
+        offset = warmup
+        for concurrency in concurrency_levels:
+            level = run_level(concurrency, runs, offset)
+            offset += runs
+            levels.append(level)
+            logger.info(f"concurrency {concurrency}: {level['throughput_per_second']} runs/s, "
+                        f"p50 {level['latency_p50']}s, p95 {level['latency_p95']}s, p99 {level['latency_p99']}s, "
+                        f"peak RSS {level['peak_rss_mb']} MB, {level['statuses']}")
+    finally:
+        fake_ollama.stop()
+        fake_openfabric.stop()
+    
+    from image_preprocessing import image_preprocessor
+    return {
+        'config': {
+            'runs': runs,
+            'warmup': warmup,
+            'llm_latency': llm_latency,
+            'token_delay': token_delay,
+            'image_latency': image_latency,
+            'model_latency': model_latency,
+            'failure_rate': failure_rate,
+            'seed': seed,
+            'workdir': workdir
+        },
+        'levels': levels,
+        'image_preprocessing': image_preprocessor.stats()
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """List the regressions of a report against a baseline report (slower p95, lower throughput, more memory)"""
+    regressions = []
+    baseline_levels = {level['concurrency']: level for level in baseline.get('levels', [])}
+    
+    for level in report['levels']:
+        reference = baseline_levels.get(level['concurrency'])
+        if not reference:
+            continue
+        name = f"concurrency {level['concurrency']}"
+        if level['latency_p95'] > reference['latency_p95'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {level['latency_p95']}s > baseline {reference['latency_p95']}s")
+        if level['throughput_per_second'] < reference['throughput_per_second'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {level['throughput_per_second']}/s < baseline {reference['throughput_per_second']}/s")
+        if level['peak_rss_mb'] > reference['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {level['peak_rss_mb']} MB > baseline {reference['peak_rss_mb']} MB")
+        if level['statuses'].get('failed', 0) > reference['statuses'].get('failed', 0):
+            regressions.append(f"{name}: {level['statuses'].get('failed', 0)} failed runs > baseline {reference['statuses'].get('failed', 0)}")
+    
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the creative pipeline offline against fake Ollama and Openfabric services")
+    parser.add_argument("--concurrency", default="1,2,4", help="Comma separated concurrency levels")
+    parser.add_argument("--runs", type=int, default=20, help="Pipelines run at each concurrency level")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured runs before the first level")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds before the first LLM token")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="Seconds between LLM tokens")
+    parser.add_argument("--image-latency", type=float, default=0.2, help="Seconds per text-to-image call")
+    parser.add_argument("--model-latency", type=float, default=0.5, help="Seconds per image-to-3D call")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of fake service requests that fail")
+    parser.add_argument("--seed", type=int, default=1234, help="Seed of the injected failures and generated text")
+    parser.add_argument("--output", default=None, help="Write the report (JSON) to this file")
+    parser.add_argument("--baseline", default=None, help="Report to compare against; exit with status 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression against the baseline")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger.setLevel(logging.INFO)
+    
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    
+    report = run_benchmark([int(c) for c in args.concurrency.split(',')], args.runs, args.warmup,
+                           args.llm_latency, args.token_delay, args.image_latency, args.model_latency,
+                           args.failure_rate, args.seed)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            logger.error(f"Regression: {regression}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+# Consecutive failures that open a circuit, and seconds it stays open before a trial call
+DEFAULT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 3))
+DEFAULT_COOLDOWN = float(os.environ.get('CIRCUIT_COOLDOWN', 120))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an app whose circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    CircuitBreaker stops calls to an app after repeated failures. The circuit
+    opens after `failure_threshold` consecutive failures; once `cooldown` seconds
+    have passed it becomes half-open and lets a single trial call through, which
+    closes it on success or opens it again on failure.
+
+    Attributes:
+        name (str): Identifier used in logs (usually the app ID).
+        failure_threshold (int): Consecutive failures that open the circuit.
+        cooldown (float): Seconds the circuit stays open before a trial call.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, name: str, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 cooldown: float = DEFAULT_COOLDOWN):
+        """
+        Initializes a closed circuit.
+
+        Args:
+            name (str): Identifier used in logs (usually the app ID).
+            failure_threshold (int): Consecutive failures that open the circuit.
+            cooldown (float): Seconds the circuit stays open before a trial call.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    @property
+    def state(self) -> str:
+        """
+        Returns the current state, moving from open to half-open once the cooldown expired.
+
+        Returns:
+            str: 'closed', 'open' or 'half-open'.
+        """
+        with self._lock:
+            return self._current_state()
+
+    # ----------------------------------------------------------------------
+    def available(self) -> bool:
+        """
+        Checks whether a call would currently be let through, without reserving it.
+
+        Returns:
+            bool: False if the circuit is open or its half-open trial is already running.
+        """
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and not self._trial_in_flight)
+
+    # ----------------------------------------------------------------------
+    def allow(self) -> bool:
+        """
+        Asks permission for a call. In half-open state only one trial call is allowed.
+
+        Returns:
+            bool: True if the call may proceed; the caller must then report it with
+            `record_success` or `record_failure`.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    # ----------------------------------------------------------------------
+    def record_success(self) -> None:
+        """
+        Reports a successful call, closing the circuit.
+        """
+        with self._lock:
+            if self._state != CLOSED:
+                logging.info(f"[{self.name}] Circuit closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    # ----------------------------------------------------------------------
+    def record_failure(self) -> None:
+        """
+        Reports a failed call, opening the circuit if the threshold is reached
+        or if it was the half-open trial.
+        """
+        with self._lock:
+            self._failures += 1
+            if self._current_state() == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    logging.warning(f"[{self.name}] Circuit opened after {self._failures} consecutive failures")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    # ----------------------------------------------------------------------
+    def record_cancelled(self) -> None:
+        """
+        Reports a call abandoned by the caller before the app answered. It counts
+        neither as success nor as failure; a half-open trial can be attempted again.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    # ----------------------------------------------------------------------
+    def snapshot(self) -> dict:
+        """
+        Returns the breaker state for inspection.
+
+        Returns:
+            dict: `state`, consecutive `failures` and seconds until a trial call
+            is allowed (`retry_in`, 0 unless open).
+        """
+        with self._lock:
+            state = self._current_state()
+            retry_in = 0.0
+            if state == OPEN:
+                retry_in = max(0.0, self._opened_at + self.cooldown - time.monotonic())
+            return {'state': state, 'failures': self._failures, 'retry_in': retry_in}
+
+    # ----------------------------------------------------------------------
+    def _current_state(self) -> str:
+        """
+        Computes the state, turning an expired open circuit half-open. Must be
+        called with the lock held.
+
+        Returns:
+            str: 'closed', 'open' or 'half-open'.
+        """
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            logging.info(f"[{self.name}] Circuit half-open, allowing a trial call")
+        return self._state
@@ -0,0 +1,117 @@
+import logging
+import threading
+from typing import Callable, List, Optional
+
+
+class OperationCancelledError(Exception):
+    """
+    Raised when work stops because its cancellation token was cancelled.
+    """
+
+
+class CancellationToken:
+    """
+    CancellationToken is shared by everything working for one request. Cancelling it
+    runs the registered callbacks once (closing streams, cancelling remote calls), and
+    long-running code checks it between steps to stop early.
+
+    Attributes:
+        reason (Optional[str]): Why the token was cancelled, once it is.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        """
+        Initializes a token that is not cancelled.
+        """
+        self.reason: Optional[str] = None
+        self._cancelled = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    @property
+    def cancelled(self) -> bool:
+        """
+        Returns whether the token was cancelled.
+
+        Returns:
+            bool: True once `cancel` was called.
+        """
+        return self._cancelled.is_set()
+
+    # ----------------------------------------------------------------------
+    def cancel(self, reason: str = "cancelled") -> None:
+        """
+        Cancels the token and runs the registered callbacks. Later calls are ignored.
+
+        Args:
+            reason (str): Why the work is cancelled, used in logs and errors.
+        """
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self.reason = reason
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logging.warning(f"Cancellation callback failed: {e}")
+
+    # ----------------------------------------------------------------------
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Registers a function to run when the token is cancelled; it runs right away
+        if the token is already cancelled.
+
+        Args:
+            callback (Callable[[], None]): Function releasing the resources of the work.
+
+        Returns:
+            Callable[[], None]: Unregisters the callback (call it once the work is over).
+        """
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    # ----------------------------------------------------------------------
+    def raise_if_cancelled(self) -> None:
+        """
+        Stops the current work if the token was cancelled.
+
+        Raises:
+            OperationCancelledError: If the token was cancelled.
+        """
+        if self._cancelled.is_set():
+            raise OperationCancelledError(self.reason)
+
+    # ----------------------------------------------------------------------
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the token is cancelled or the timeout expires.
+
+        Args:
+            timeout (Optional[float]): Maximum seconds to wait (None waits forever).
+
+        Returns:
+            bool: True if the token was cancelled.
+        """
+        return self._cancelled.wait(timeout)
+
+    # ----------------------------------------------------------------------
+    def _remove(self, callback: Callable[[], None]) -> None:
+        """
+        Unregisters a callback if it did not run yet.
+
+        Args:
+            callback (Callable[[], None]): The registered function.
+        """
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
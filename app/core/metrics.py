@@ -0,0 +1,351 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Default histogram buckets (seconds), covering sub-second steps up to multi-minute 3D conversions
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """
+    Formats label pairs in Prometheus exposition syntax.
+
+    Args:
+        names (Sequence[str]): Label names.
+        values (Sequence[str]): Label values, in the same order.
+        extra (Optional[Tuple[str, str]]): An additional (name, value) pair, e.g. the `le` bucket.
+
+    Returns:
+        str: `{name="value",...}`, or an empty string without labels.
+    """
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _Metric:
+    """
+    Base class of labelled metrics.
+
+    Attributes:
+        name (str): Metric name.
+        help (str): Description shown in the exposition.
+        labels (Tuple[str, ...]): Label names.
+    """
+    type = "untyped"
+
+    # ----------------------------------------------------------------------
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    # ----------------------------------------------------------------------
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self._samples()
+
+    # ----------------------------------------------------------------------
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count, per label combination.
+    """
+    type = "counter"
+
+    # ----------------------------------------------------------------------
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    # ----------------------------------------------------------------------
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """
+        Increments the counter.
+
+        Args:
+            amount (float): Increment (default 1).
+            **labels (str): Label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    # ----------------------------------------------------------------------
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down, per label combination.
+    """
+    type = "gauge"
+
+    # ----------------------------------------------------------------------
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    # ----------------------------------------------------------------------
+    def set(self, value: float, **labels: str) -> None:
+        """
+        Sets the gauge.
+
+        Args:
+            value (float): New value.
+            **labels (str): Label values.
+        """
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    # ----------------------------------------------------------------------
+    def clear(self) -> None:
+        """
+        Removes every label combination, so labels no longer set stop being exported.
+        """
+        with self._lock:
+            self._values.clear()
+
+    # ----------------------------------------------------------------------
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets, per label combination.
+    """
+    type = "histogram"
+
+    # ----------------------------------------------------------------------
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    # ----------------------------------------------------------------------
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Records one observation.
+
+        Args:
+            value (float): Observed value (seconds for durations).
+            **labels (str): Label values.
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    # ----------------------------------------------------------------------
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', repr(float(bound))))} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, ('le', '+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    MetricsRegistry holds the process metrics and renders them in the Prometheus
+    text exposition format. Collectors registered with `add_collector` run before
+    each render to refresh gauges that reflect current state.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------------------------
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    # ----------------------------------------------------------------------
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        """Returns the counter with this name, creating it if needed."""
+        return self._register(Counter(name, help, labels))
+
+    # ----------------------------------------------------------------------
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        """Returns the gauge with this name, creating it if needed."""
+        return self._register(Gauge(name, help, labels))
+
+    # ----------------------------------------------------------------------
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Returns the histogram with this name, creating it if needed."""
+        return self._register(Histogram(name, help, labels, buckets))
+
+    # ----------------------------------------------------------------------
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        Registers a callback run before each render.
+
+        Args:
+            collector (Callable[[], None]): Refreshes gauges from current state.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    # ----------------------------------------------------------------------
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text.
+        """
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                logging.error(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry and the pipeline metrics
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram('pipeline_stage_seconds', 'Duration of each pipeline stage per run', ['stage'])
+RUN_SECONDS = registry.histogram('pipeline_run_seconds', 'Duration of whole pipeline runs', ['status'])
+RUNS_TOTAL = registry.counter('pipeline_runs_total', 'Pipeline runs by final status', ['status'])
+REMOTE_CALL_SECONDS = registry.histogram('openfabric_call_seconds', 'Duration of Openfabric app calls', ['app_id', 'outcome'])
+REMOTE_INIT_SECONDS = registry.histogram('openfabric_init_seconds', 'Duration of Openfabric app initializations', ['app_id', 'status'])
+
+
+class RunTimer:
+    """
+    RunTimer measures the stages of one pipeline run. Durations of a stage
+    measured several times are added up; they are published to the stage
+    histogram once, when the run finishes.
+
+    Attributes:
+        durations (Dict[str, float]): Seconds spent in each stage so far.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._started = time.monotonic()
+        self._finished = False
+
+    # ----------------------------------------------------------------------
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Times the enclosed block as (part of) a stage.
+
+        Args:
+            name (str): Stage name.
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - started)
+
+    # ----------------------------------------------------------------------
+    def record(self, name: str, seconds: float) -> None:
+        """
+        Adds a duration to a stage.
+
+        Args:
+            name (str): Stage name.
+            seconds (float): Duration to add.
+        """
+        self.durations[name] = round(self.durations.get(name, 0.0) + seconds, 4)
+
+    # ----------------------------------------------------------------------
+    def finish(self, status: str) -> None:
+        """
+        Publishes the stage durations and the run outcome. Later calls are ignored.
+
+        Args:
+            status (str): Final status of the run (e.g. 'success', 'image_only', 'failed').
+        """
+        if self._finished:
+            return
+        self._finished = True
+        for name, seconds in self.durations.items():
+            STAGE_SECONDS.observe(seconds, stage=name)
+        RUN_SECONDS.observe(time.monotonic() - self._started, status=status)
+        RUNS_TOTAL.inc(status=status)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Serves the registry on /metrics.
+    """
+
+    # ----------------------------------------------------------------------
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # ----------------------------------------------------------------------
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = '0.0.0.0') -> Optional[ThreadingHTTPServer]:
+    """
+    Serves the metrics over HTTP on a background thread.
+
+    Args:
+        port (int): Port to listen on.
+        host (str): Interface to bind (default: all).
+
+    Returns:
+        Optional[ThreadingHTTPServer]: The running server, or None if the port is unavailable.
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logging.error(f"Could not start metrics server on port {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logging.info(f"Metrics available on http://{host}:{port}/metrics")
+    return server
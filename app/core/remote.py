@@ -1,8 +1,22 @@
-from typing import Optional, Union
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, List, Optional, Union
 
 from openfabric_pysdk.helper import Proxy
 from openfabric_pysdk.helper.proxy import ExecutionResult
 
+# Seconds between two checks of the outstanding executions
+POLL_INTERVAL = float(os.environ.get('REMOTE_POLL_INTERVAL', 0.1))
+
+# Default seconds between two progress callbacks of an execution
+PROGRESS_INTERVAL = float(os.environ.get('REMOTE_PROGRESS_INTERVAL', 5))
+
+# Callback receiving the status, the default progress bar and the messages of an execution
+ProgressCallback = Callable[[str, Any, List[str]], None]
+
 
 class Remote:
     """
@@ -40,6 +54,25 @@ class Remote:
         self.client = Proxy(self.proxy_url, self.proxy_tag, ssl_verify=False)
         return self
 
+    # ----------------------------------------------------------------------
+    def is_connected(self) -> bool:
+        """
+        Checks whether the proxy client exists and its WebSocket is connected.
+
+        Returns:
+            bool: True if the proxy is connected.
+        """
+        return self.client is not None and self.client.is_connected()
+
+    # ----------------------------------------------------------------------
+    def disconnect(self) -> None:
+        """
+        Closes the proxy client, if any. The instance can be connected again later.
+        """
+        if self.client is not None:
+            self.client.disconnect()
+            self.client = None
+
     # ----------------------------------------------------------------------
     def execute(self, inputs: dict, uid: str) -> Union[ExecutionResult, None]:
         """
@@ -58,30 +91,64 @@ class Remote:
         return self.client.request(inputs, uid)
 
     # ----------------------------------------------------------------------
-    @staticmethod
-    def get_response(output: ExecutionResult) -> Union[dict, None]:
+    def get_response_async(self, output: ExecutionResult, timeout: Optional[float] = None,
+                           on_progress: Optional[ProgressCallback] = None,
+                           progress_interval: float = PROGRESS_INTERVAL) -> Future:
+        """
+        Returns a future of the response, without blocking. The execution is watched
+        by the shared poller thread; cancelling the future cancels the proxy request.
+
+        Args:
+            output (ExecutionResult): The result returned from a proxy request.
+            timeout (Optional[float]): Seconds after which the request is cancelled and
+                the future fails with TimeoutError (None waits forever).
+            on_progress (Optional[ProgressCallback]): Called every `progress_interval`
+                seconds with the status, progress and messages of the execution.
+            progress_interval (float): Seconds between two progress callbacks.
+
+        Returns:
+            Future: Resolves to the response data, or fails if the request failed,
+            was cancelled, timed out or the connection was lost.
+        """
+        if output is None:
+            future = Future()
+            future.set_result(None)
+            return future
+        return _poller.watch(self, output, timeout, on_progress, progress_interval)
+
+    # ----------------------------------------------------------------------
+    def get_response(self, output: ExecutionResult, timeout: Optional[float] = None) -> Union[dict, None]:
         """
         Waits for the result and processes the output.
 
         Args:
             output (ExecutionResult): The result returned from a proxy request.
+            timeout (Optional[float]): Seconds to wait before cancelling the request (None waits forever).
 
         Returns:
             Union[dict, None]: The response data if successful, None otherwise.
 
         Raises:
             Exception: If the request failed or was cancelled.
+            TimeoutError: If no response arrived within `timeout` seconds.
         """
-        if output is None:
-            return None
+        return self.get_response_async(output, timeout).result()
 
-        output.wait()
-        status = str(output.status()).lower()
-        if status == "completed":
-            return output.data()
-        if status in ("cancelled", "failed"):
-            raise Exception("The request to the proxy app failed or was cancelled!")
-        return None
+    # ----------------------------------------------------------------------
+    def cancel(self, output: ExecutionResult) -> None:
+        """
+        Stops waiting for an execution and asks the app to drop its queued request.
+
+        Args:
+            output (ExecutionResult): The result returned from a proxy request.
+        """
+        qid = output.request_qid()
+        output.cancel()
+        if qid and self.client is not None:
+            try:
+                self.client.delete(qid)
+            except Exception as e:
+                logging.warning(f"[{self.proxy_tag}] Could not cancel request {qid}: {e}")
 
     # ----------------------------------------------------------------------
     def execute_sync(self, inputs: dict, configs: dict, uid: str) -> Union[dict, None]:
@@ -100,4 +167,172 @@ class Remote:
             return None
 
         output = self.client.execute(inputs, configs, uid)
-        return Remote.get_response(output)
+        return self.get_response(output)
+
+
+class _Watch:
+    """
+    An execution followed by the poller, with the future it settles.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, remote: Remote, output: ExecutionResult, timeout: Optional[float],
+                 on_progress: Optional[ProgressCallback], progress_interval: float):
+        now = time.monotonic()
+        self.remote = remote
+        self.output = output
+        self.timeout = timeout
+        self.deadline = now + timeout if timeout is not None else None
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.next_progress = now + progress_interval
+        self.future = Future()
+
+
+class ResponsePoller:
+    """
+    ResponsePoller follows every outstanding proxy execution from a single background
+    thread, so waiting for a remote app does not hold a thread per request. It settles
+    the future of each execution when it completes, fails, loses its connection or
+    reaches its deadline, and reports progress periodically.
+
+    Attributes:
+        interval (float): Seconds between two checks of the outstanding executions.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, interval: float = POLL_INTERVAL):
+        """
+        Initializes an idle poller; its thread starts with the first execution.
+
+        Args:
+            interval (float): Seconds between two checks of the outstanding executions.
+        """
+        self.interval = interval
+        self._watches: List[_Watch] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ----------------------------------------------------------------------
+    def watch(self, remote: Remote, output: ExecutionResult, timeout: Optional[float],
+              on_progress: Optional[ProgressCallback], progress_interval: float) -> Future:
+        """
+        Starts following an execution.
+
+        Args:
+            remote (Remote): The connection the request was sent on.
+            output (ExecutionResult): The result returned from the proxy request.
+            timeout (Optional[float]): Seconds before the request is cancelled (None: no deadline).
+            on_progress (Optional[ProgressCallback]): Periodic progress callback.
+            progress_interval (float): Seconds between two progress callbacks.
+
+        Returns:
+            Future: Settled with the response data or the failure.
+        """
+        watch = _Watch(remote, output, timeout, on_progress, progress_interval)
+        watch.future.add_done_callback(lambda future: remote.cancel(output) if future.cancelled() else None)
+        with self._lock:
+            self._watches.append(watch)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="remote-poller", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return watch.future
+
+    # ----------------------------------------------------------------------
+    def pending(self) -> int:
+        """
+        Returns the number of executions still being followed.
+
+        Returns:
+            int: Outstanding executions.
+        """
+        with self._lock:
+            return len(self._watches)
+
+    # ----------------------------------------------------------------------
+    def _run(self) -> None:
+        """
+        Poller thread: checks every outstanding execution each interval, sleeping while there is none.
+        """
+        while True:
+            with self._lock:
+                watches = list(self._watches)
+                if not watches:
+                    self._wakeup.clear()
+            if not watches:
+                self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            finished = [watch for watch in watches if self._check(watch, now)]
+            if finished:
+                with self._lock:
+                    self._watches = [watch for watch in self._watches if watch not in finished]
+            time.sleep(self.interval)
+
+    # ----------------------------------------------------------------------
+    def _check(self, watch: _Watch, now: float) -> bool:
+        """
+        Checks one execution, settling its future if it is over.
+
+        Args:
+            watch (_Watch): The execution to check.
+            now (float): Current monotonic time.
+
+        Returns:
+            bool: True if the execution no longer needs to be followed.
+        """
+        if watch.future.done():
+            # Cancelled by the caller; the proxy request was cancelled by the done callback
+            return True
+
+        try:
+            status = str(watch.output.status()).lower()
+            if status == "completed":
+                return self._settle(watch, result=watch.output.data())
+            if status in ("cancelled", "failed"):
+                return self._settle(watch, error=Exception("The request to the proxy app failed or was cancelled!"))
+            if not watch.remote.is_connected():
+                return self._settle(watch, error=ConnectionError(f"[{watch.remote.proxy_tag}] Connection lost while waiting for the response"))
+            if watch.deadline is not None and now >= watch.deadline:
+                watch.remote.cancel(watch.output)
+                return self._settle(watch, error=TimeoutError(f"[{watch.remote.proxy_tag}] No response within {watch.timeout}s"))
+        except Exception as e:
+            return self._settle(watch, error=e)
+
+        if watch.on_progress is not None and now >= watch.next_progress:
+            watch.next_progress = now + watch.progress_interval
+            try:
+                watch.on_progress(status, watch.output.progress(), watch.output.messages())
+            except Exception as e:
+                logging.warning(f"Progress callback failed: {e}")
+        return False
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _settle(watch: _Watch, result: Any = None, error: Optional[BaseException] = None) -> bool:
+        """
+        Settles the future of an execution unless the caller cancelled it meanwhile.
+
+        Args:
+            watch (_Watch): The finished execution.
+            result (Any): The response data.
+            error (Optional[BaseException]): The failure, if any.
+
+        Returns:
+            bool: Always True (the execution is over).
+        """
+        try:
+            if error is not None:
+                watch.future.set_exception(error)
+            else:
+                watch.future.set_result(result)
+        except InvalidStateError:
+            pass
+        return True
+
+
+# Poller shared by every Remote
+_poller = ResponsePoller()
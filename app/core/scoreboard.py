@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Default location of the persisted scoreboard
+DEFAULT_SCOREBOARD_PATH = os.environ.get('BACKEND_SCOREBOARD_PATH', 'datastore/backend_scores.json')
+
+
+class Scoreboard:
+    """
+    Scoreboard keeps per-app call statistics (success rate, EWMA latency, last
+    failure) and ranks equivalent apps so the healthiest and fastest is tried first.
+    The statistics are persisted as JSON so a restart keeps what was learned.
+
+    Attributes:
+        path (Optional[str]): JSON file the statistics are loaded from and saved to.
+        alpha (float): Weight of the newest sample in the latency EWMA.
+        latency_scale (float): Latency (seconds) at which an app's score is halved.
+        _stats (Dict[str, dict]): Statistics per app ID.
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, path: Optional[str] = DEFAULT_SCOREBOARD_PATH, alpha: float = 0.3,
+                 latency_scale: float = 60.0):
+        """
+        Initializes the scoreboard and loads previously saved statistics.
+
+        Args:
+            path (Optional[str]): JSON file used for persistence (None keeps it in memory only).
+            alpha (float): Weight of the newest sample in the latency EWMA.
+            latency_scale (float): Latency (seconds) at which an app's score is halved.
+        """
+        self.path = path
+        self.alpha = alpha
+        self.latency_scale = latency_scale
+        self._stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    # ----------------------------------------------------------------------
+    def record(self, app_id: str, success: bool, latency: float) -> None:
+        """
+        Records the outcome of one call and persists the updated statistics.
+
+        Args:
+            app_id (str): The application ID that was called.
+            success (bool): Whether the call returned a result.
+            latency (float): Duration of the call in seconds.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(app_id, {
+                'calls': 0,
+                'successes': 0,
+                'failures': 0,
+                'consecutive_failures': 0,
+                'ewma_latency': None,
+                'last_success': None,
+                'last_failure': None,
+            })
+            stats['calls'] += 1
+            if success:
+                stats['successes'] += 1
+                stats['consecutive_failures'] = 0
+                stats['last_success'] = time.time()
+                if stats['ewma_latency'] is None:
+                    stats['ewma_latency'] = latency
+                else:
+                    stats['ewma_latency'] = self.alpha * latency + (1 - self.alpha) * stats['ewma_latency']
+            else:
+                stats['failures'] += 1
+                stats['consecutive_failures'] += 1
+                stats['last_failure'] = time.time()
+            self._save()
+
+    # ----------------------------------------------------------------------
+    def score(self, app_id: str) -> float:
+        """
+        Scores an app: the smoothed success rate, halved for each consecutive
+        failure and reduced as the EWMA latency grows. Unknown apps score 0.5.
+
+        Args:
+            app_id (str): The application ID to score.
+
+        Returns:
+            float: Score between 0 and 1, higher is better.
+        """
+        with self._lock:
+            stats = self._stats.get(app_id)
+            if stats is None:
+                return 0.5
+            success_rate = (stats['successes'] + 1) / (stats['calls'] + 2)
+            score = success_rate * 0.5 ** stats['consecutive_failures']
+            if stats['ewma_latency'] is not None:
+                score /= 1 + stats['ewma_latency'] / self.latency_scale
+            return score
+
+    # ----------------------------------------------------------------------
+    def rank(self, app_ids: List[str]) -> List[str]:
+        """
+        Orders app IDs by descending score. Ties keep the given order.
+
+        Args:
+            app_ids (List[str]): Candidate application IDs in default order.
+
+        Returns:
+            List[str]: The same IDs, best first.
+        """
+        scores = {app_id: self.score(app_id) for app_id in app_ids}
+        return sorted(app_ids, key=lambda app_id: -scores[app_id])
+
+    # ----------------------------------------------------------------------
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        Returns a copy of the statistics with the current score of each app.
+
+        Returns:
+            Dict[str, dict]: Statistics per app ID.
+        """
+        with self._lock:
+            stats = {app_id: dict(values) for app_id, values in self._stats.items()}
+        for app_id, values in stats.items():
+            values['score'] = self.score(app_id)
+        return stats
+
+    # ----------------------------------------------------------------------
+    def load(self) -> None:
+        """
+        Loads the statistics from `path`, if the file exists and is readable.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._stats = json.load(f)
+            logging.info(f"Backend scoreboard loaded: {len(self._stats)} apps")
+        except Exception as e:
+            logging.error(f"Could not load backend scoreboard from {self.path}: {e}")
+
+    # ----------------------------------------------------------------------
+    def _save(self) -> None:
+        """
+        Writes the statistics to `path` atomically. Must be called with the lock held.
+        """
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._stats, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"Could not save backend scoreboard to {self.path}: {e}")
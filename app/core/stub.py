@@ -1,11 +1,21 @@
 import json
 import logging
+import os
 import pprint
-from typing import Any, Dict, List, Literal, Tuple
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, InvalidStateError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from core.remote import Remote
+from core.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from core.cancellation import CancellationToken, OperationCancelledError
+from core.metrics import REMOTE_CALL_SECONDS, REMOTE_INIT_SECONDS, registry
+from core.remote import ProgressCallback, Remote
+from core.scoreboard import Scoreboard
+from openfabric_pysdk.fields import Resource
 from openfabric_pysdk.helper import has_resource_fields, json_schema_to_marshmallow, resolve_resources
 from openfabric_pysdk.loader import OutputSchemaInst
 
@@ -14,90 +24,706 @@ Manifests = Dict[str, dict]
 Schemas = Dict[str, Tuple[dict, dict]]
 Connections = Dict[str, Remote]
 
+# Default time (seconds) a caller waits for an app to finish initializing
+DEFAULT_INIT_TIMEOUT = float(os.environ.get('STUB_INIT_TIMEOUT', 15))
+
+# Default seconds an app may take to answer a call before the request is cancelled
+DEFAULT_CALL_TIMEOUT = float(os.environ.get('STUB_CALL_TIMEOUT', 900))
+
+# Seconds allowed to download one resource field of a result
+RESOURCE_TIMEOUT = float(os.environ.get('STUB_RESOURCE_TIMEOUT', 60))
+
+# Base URL of an app ({app_id} is replaced by the app ID); the WebSocket URL uses the matching ws scheme
+OPENFABRIC_URL_TEMPLATE = os.environ.get('OPENFABRIC_URL_TEMPLATE', 'https://{app_id}')
+
+# Circuit state exported as a number: 0 closed, 1 half-open, 2 open
+CIRCUIT_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+CIRCUIT_STATE = registry.gauge('openfabric_circuit_state', 'Circuit breaker state per app (0 closed, 1 half-open, 2 open)', ['app_id'])
+CIRCUIT_FAILURES = registry.gauge('openfabric_circuit_failures', 'Consecutive failed calls per app', ['app_id'])
+
 
 class Stub:
     """
     Stub acts as a lightweight client interface that initializes remote connections
     to multiple Openfabric applications, fetching their manifests, schemas, and enabling
-    execution of calls to these apps.
+    execution of calls to these apps. Apps are initialized concurrently in the background,
+    so each one can be used as soon as its own connection is ready. Connections that drop
+    are re-established on the next call.
 
     Attributes:
         _schema (Schemas): Stores input/output schemas for each app ID.
         _manifest (Manifests): Stores manifest metadata for each app ID.
         _connections (Connections): Stores active Remote connections for each app ID.
+        _pending (Dict[str, Future]): In-flight initialization of each app ID.
+        _timings (Dict[str, dict]): Duration and outcome of the last initialization per app ID.
+        scoreboard (Optional[Scoreboard]): Records the outcome and latency of every call.
+        _breakers (Dict[str, CircuitBreaker]): Circuit breaker guarding calls to each app ID.
+        _output_schemas (Dict[str, Tuple[Any, bool, List[str]]]): Compiled output schema of each
+            app ID, whether it has resource fields and the names of its top-level resource fields.
+        _session (requests.Session): Pooled HTTP session for manifests, schemas and resources.
     """
 
     # ----------------------------------------------------------------------
-    def __init__(self, app_ids: List[str]):
+    def __init__(self, app_ids: List[str], lazy: bool = False, init_timeout: Optional[float] = None,
+                 scoreboard: Optional[Scoreboard] = None, url_template: str = OPENFABRIC_URL_TEMPLATE,
+                 remote_factory: Callable[[str, str], Remote] = Remote):
         """
         Initializes the Stub instance by loading manifests, schemas, and connections
         for each given app ID.
 
         Args:
             app_ids (List[str]): A list of application identifiers (hostnames or URLs).
+            lazy (bool): If True, only register the app IDs; each app is initialized
+                on first use instead of at construction time.
+            init_timeout (Optional[float]): Overall deadline for initializing all apps.
+                Apps still initializing after it keep connecting in the background.
+            scoreboard (Optional[Scoreboard]): Call statistics to update on every call.
+            url_template (str): Base URL of each app, with an `{app_id}` placeholder.
+            remote_factory (Callable[[str, str], Remote]): Creates the connection of an
+                app from its WebSocket URL and proxy tag (default: Remote).
         """
         self._schema: Schemas = {}
         self._manifest: Manifests = {}
         self._connections: Connections = {}
+        self._app_ids: List[str] = []
+        self._pending: Dict[str, Future] = {}
+        self._timings: Dict[str, dict] = {}
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="stub-init")
+        self.scoreboard = scoreboard
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._url_template = url_template
+        self._remote_factory = remote_factory
+        self._output_schemas: Dict[str, Tuple[Any, bool, List[str]]] = {}
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        # Calls are completed on their own pool: a completion blocks on its downloads, which
+        # would starve the resource pool (and never finish) if they shared its workers
+        self._completion_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="stub-complete")
+        self._resource_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="stub-resource")
 
-        for app_id in app_ids:
-            base_url = app_id.strip('/')
+        self.register(app_ids)
+        if not lazy:
+            futures = self.warm_up(app_ids)
+            _, not_done = wait(list(futures.values()), timeout=init_timeout)
+            if not_done:
+                slow = [app_id for app_id, future in futures.items() if future in not_done]
+                logging.warning(f"Stub init deadline reached, still connecting: {slow}")
 
-            try:
+    # ----------------------------------------------------------------------
+    def register(self, app_ids: List[str]) -> None:
+        """
+        Adds app IDs to the set known by this stub without connecting to them.
+
+        Args:
+            app_ids (List[str]): Application identifiers to register.
+        """
+        with self._lock:
+            for app_id in app_ids:
+                if app_id not in self._app_ids:
+                    self._app_ids.append(app_id)
+                    self._breakers[app_id] = CircuitBreaker(app_id)
+
+    # ----------------------------------------------------------------------
+    def warm_up(self, app_ids: Optional[List[str]] = None) -> Dict[str, Future]:
+        """
+        Starts initializing, in parallel, every given app that is not connected yet.
+        Returns immediately.
+
+        Args:
+            app_ids (Optional[List[str]]): Apps to initialize (default: all registered apps).
+
+        Returns:
+            Dict[str, Future]: The initialization futures, keyed by app ID. Each one
+            resolves to True if the app connected.
+        """
+        if app_ids is None:
+            app_ids = list(self._app_ids)
+        self.register(app_ids)
+        return {app_id: self._start(app_id) for app_id in app_ids}
+
+    # ----------------------------------------------------------------------
+    def connect(self, app_id: str, timeout: Optional[float] = DEFAULT_INIT_TIMEOUT) -> bool:
+        """
+        Makes sure the app is ready to be called, waiting at most `timeout` seconds
+        for its initialization. Other apps are not waited for.
+
+        Args:
+            app_id (str): The application ID to connect to.
+            timeout (Optional[float]): Maximum seconds to wait (None waits forever).
+
+        Returns:
+            bool: True if the app has a live connection, False otherwise.
+        """
+        self.register([app_id])
+        if self.is_connected(app_id):
+            return True
+
+        try:
+            return self._start(app_id).result(timeout=timeout)
+        except FutureTimeoutError:
+            logging.warning(f"[{app_id}] Still initializing after {timeout}s.")
+            return False
+
+    # ----------------------------------------------------------------------
+    def is_connected(self, app_id: str) -> bool:
+        """
+        Checks whether the app currently has a live connection, without connecting.
+
+        Args:
+            app_id (str): The application ID to check.
+
+        Returns:
+            bool: True if a live connection exists.
+        """
+        connection = self._connections.get(app_id)
+        return connection is not None and connection.is_connected()
+
+    # ----------------------------------------------------------------------
+    def is_available(self, app_id: str) -> bool:
+        """
+        Checks whether the circuit breaker of the app would let a call through.
+
+        Args:
+            app_id (str): The application ID to check.
+
+        Returns:
+            bool: False if the app's circuit is open.
+        """
+        breaker = self._breakers.get(app_id)
+        return breaker is None or breaker.available()
+
+    # ----------------------------------------------------------------------
+    def breaker_states(self) -> Dict[str, dict]:
+        """
+        Returns the circuit breaker state of every registered app.
+
+        Returns:
+            Dict[str, dict]: Per app ID, the `state` ('closed', 'open' or 'half-open'),
+            consecutive `failures` and seconds until a trial call is allowed (`retry_in`).
+        """
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {app_id: breaker.snapshot() for app_id, breaker in breakers.items()}
+
+    # ----------------------------------------------------------------------
+    def export_metrics(self) -> None:
+        """
+        Updates the circuit breaker gauges from the current breaker states.
+        Called by the metrics collector of the shared stub.
+        """
+        for app_id, state in self.breaker_states().items():
+            CIRCUIT_STATE.set(CIRCUIT_STATE_VALUES.get(state['state'], 0), app_id=app_id)
+            CIRCUIT_FAILURES.set(state['failures'], app_id=app_id)
+
+    # ----------------------------------------------------------------------
+    def init_timings(self) -> Dict[str, dict]:
+        """
+        Returns how long the last initialization of each app took and how it ended.
+
+        Returns:
+            Dict[str, dict]: Per app ID, the `status` ('pending', 'connected' or 'failed'),
+            the total `seconds` and the time spent on `manifest`, `schema` and `connect`.
+        """
+        with self._lock:
+            return {app_id: dict(timing) for app_id, timing in self._timings.items()}
+
+    # ----------------------------------------------------------------------
+    def url(self, app_id: str) -> str:
+        """
+        Builds the base HTTP(S) URL of an app.
+
+        Args:
+            app_id (str): The application ID.
+
+        Returns:
+            str: The URL, without trailing slash.
+        """
+        return self._url_template.format(app_id=app_id.strip('/')).rstrip('/')
+
+    # ----------------------------------------------------------------------
+    def _start(self, app_id: str) -> Future:
+        """
+        Returns the in-flight initialization of an app, submitting a new one if needed.
+
+        Args:
+            app_id (str): The application ID to initialize.
+
+        Returns:
+            Future: Resolves to True if the app connected.
+        """
+        with self._lock:
+            future = self._pending.get(app_id)
+            if future is not None and future.done() and self.is_connected(app_id):
+                return future
+            if future is None or future.done():
+                self._timings[app_id] = {'status': 'pending'}
+                future = self._executor.submit(self._initialize, app_id)
+                self._pending[app_id] = future
+            return future
+
+    # ----------------------------------------------------------------------
+    def _initialize(self, app_id: str) -> bool:
+        """
+        Fetches the manifest and schemas (only the first time) and establishes the
+        Remote connection of an app. Runs on the init executor.
+
+        Args:
+            app_id (str): The application ID to initialize.
+
+        Returns:
+            bool: True if the app has a live connection afterwards.
+        """
+        if app_id in self._connections:
+            logging.warning(f"[{app_id}] Connection lost, reconnecting.")
+            with self._lock:
+                self._drop(app_id)
+
+        base_url = self.url(app_id)
+        timing = {'status': 'pending'}
+        started = time.monotonic()
+
+        try:
+            if app_id not in self._manifest:
                 # Fetch manifest
-                manifest = requests.get(f"https://{base_url}/manifest", timeout=5).json()
+                step = time.monotonic()
+                manifest = self._session.get(f"{base_url}/manifest", timeout=5).json()
                 logging.info(f"[{app_id}] Manifest loaded: {manifest}")
                 self._manifest[app_id] = manifest
+                timing['manifest'] = time.monotonic() - step
 
+            if app_id not in self._schema:
                 # Fetch input schema
-                input_schema = requests.get(f"https://{base_url}/schema?type=input", timeout=5).json()
+                step = time.monotonic()
+                input_schema = self._session.get(f"{base_url}/schema?type=input", timeout=5).json()
                 logging.info(f"[{app_id}] Input schema loaded: {input_schema}")
 
                 # Fetch output schema
-                output_schema = requests.get(f"https://{base_url}/schema?type=output", timeout=5).json()
+                output_schema = self._session.get(f"{base_url}/schema?type=output", timeout=5).json()
                 logging.info(f"[{app_id}] Output schema loaded: {output_schema}")
                 self._schema[app_id] = (input_schema, output_schema)
+                timing['schema'] = time.monotonic() - step
 
-                # Establish Remote WebSocket connection
-                self._connections[app_id] = Remote(f"wss://{base_url}/app", f"{app_id}-proxy").connect()
-                logging.info(f"[{app_id}] Connection established.")
-            except Exception as e:
-                logging.error(f"[{app_id}] Initialization failed: {e}")
+            # Establish Remote WebSocket connection
+            step = time.monotonic()
+            ws_url = 'ws' + base_url[len('http'):] if base_url.startswith('http') else base_url
+            self._connections[app_id] = self._remote_factory(f"{ws_url}/app", f"{app_id}-proxy").connect()
+            timing['connect'] = time.monotonic() - step
+            timing['status'] = 'connected'
+            logging.info(f"[{app_id}] Connection established in {time.monotonic() - started:.2f}s.")
+            return True
+        except Exception as e:
+            timing['status'] = 'failed'
+            timing['error'] = str(e)
+            logging.error(f"[{app_id}] Initialization failed: {e}")
+            return False
+        finally:
+            timing['seconds'] = time.monotonic() - started
+            REMOTE_INIT_SECONDS.observe(timing['seconds'], app_id=app_id, status=timing['status'])
+            with self._lock:
+                self._timings[app_id] = timing
 
     # ----------------------------------------------------------------------
-    def call(self, app_id: str, data: Any, uid: str = 'super-user') -> dict:
+    def _drop(self, app_id: str) -> None:
         """
-        Sends a request to the specified app via its Remote connection.
+        Closes and forgets the connection of an app so the next use reconnects.
+        Manifest and schemas are kept.
+
+        Args:
+            app_id (str): The application ID whose connection is dropped.
+        """
+        connection = self._connections.pop(app_id, None)
+        if connection is not None:
+            connection.disconnect()
+
+    # ----------------------------------------------------------------------
+    def close(self) -> None:
+        """
+        Releases the stub: stops its executors once their running tasks end (queued
+        initializations are dropped), closes every connection and the HTTP session.
+        Calls still in flight end with None.
+        """
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+        for executor in (self._executor, self._completion_executor, self._resource_executor):
+            executor.shutdown(wait=False)
+        with self._lock:
+            for app_id in list(self._connections):
+                self._drop(app_id)
+        self._session.close()
+
+    # ----------------------------------------------------------------------
+    def call(self, app_id: str, data: Any, uid: str = 'super-user', timeout: Optional[float] = DEFAULT_CALL_TIMEOUT,
+             on_progress: Optional[ProgressCallback] = None, cancel_token: Optional[CancellationToken] = None) -> dict:
+        """
+        Sends a request to the specified app via its Remote connection and waits for the output.
 
         Args:
             app_id (str): The application ID to route the request to.
             data (Any): The input data to send to the app.
             uid (str): The unique user/session identifier for tracking (default: 'super-user').
+            timeout (Optional[float]): Seconds before the request is cancelled (None waits forever).
+                Downloading the resource fields may take up to RESOURCE_TIMEOUT more.
+            on_progress (Optional[ProgressCallback]): Called periodically with the execution progress.
+            cancel_token (Optional[CancellationToken]): Cancelling it cancels the proxy request.
 
         Returns:
-            dict: The output data returned by the app.
+            dict: The output data returned by the app, or None if the execution failed.
 
         Raises:
-            Exception: If no connection is found for the provided app ID, or execution fails.
+            CircuitOpenError: If the app's circuit is open; the app is not contacted.
+            OperationCancelledError: If the token was cancelled before the app answered.
+            TimeoutError: If no result (resources included) arrived in time; the call is cancelled.
+            Exception: If no connection is found for the provided app ID.
         """
-        connection = self._connections.get(app_id)
+        future = self.call_async(app_id, data, uid, timeout, on_progress, cancel_token)
+        try:
+            return future.result(timeout=None if timeout is None else timeout + RESOURCE_TIMEOUT)
+        except CancelledError:
+            raise OperationCancelledError(cancel_token.reason if cancel_token else "cancelled")
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"[{app_id}] No result after {timeout + RESOURCE_TIMEOUT}s")
+
+    # ----------------------------------------------------------------------
+    def call_async(self, app_id: str, data: Any, uid: str = 'super-user',
+                   timeout: Optional[float] = DEFAULT_CALL_TIMEOUT,
+                   on_progress: Optional[ProgressCallback] = None,
+                   cancel_token: Optional[CancellationToken] = None) -> Future:
+        """
+        Sends a request to the specified app via its Remote connection without waiting
+        for the output. An app that is still initializing is waited for in the background:
+        the request is sent once it is connected. The response is followed by the shared
+        poller thread; the call is then completed on the completion executor, which
+        downloads resource fields on the resource executor. Cancelling the returned
+        future cancels the proxy request.
+
+        Args:
+            app_id (str): The application ID to route the request to.
+            data (Any): The input data to send to the app.
+            uid (str): The unique user/session identifier for tracking (default: 'super-user').
+            timeout (Optional[float]): Seconds before the request is cancelled (None waits forever).
+            on_progress (Optional[ProgressCallback]): Called periodically with the execution progress.
+            cancel_token (Optional[CancellationToken]): Cancelling it cancels the returned future.
+
+        Returns:
+            Future: Resolves to the output data returned by the app, or None if the execution
+            failed. Fails with an Exception if the app could not be connected.
+
+        Raises:
+            CircuitOpenError: If the app's circuit is open; the app is not contacted.
+            OperationCancelledError: If the token is already cancelled; the app is not contacted.
+        """
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        self.register([app_id])
+        if not self._breakers[app_id].allow():
+            raise CircuitOpenError(f"Circuit open for app ID: {app_id}")
+
+        outcome = Future()
+        if cancel_token is not None:
+            unregister = cancel_token.add_callback(outcome.cancel)
+            outcome.add_done_callback(lambda _: unregister())
+        if self.is_connected(app_id):
+            self._send(app_id, data, uid, timeout, on_progress, outcome)
+        else:
+            # Never block the caller on the initialization (call_first hedges to other apps meanwhile)
+            self._start(app_id).add_done_callback(
+                lambda _: self._send(app_id, data, uid, timeout, on_progress, outcome))
+        return outcome
+
+    # ----------------------------------------------------------------------
+    def _send(self, app_id: str, data: Any, uid: str, timeout: Optional[float],
+              on_progress: Optional[ProgressCallback], outcome: Future) -> None:
+        """
+        Sends the request of a call once its app is initialized, or fails the call if
+        the app could not be connected.
+
+        Args:
+            app_id (str): The application ID to route the request to.
+            data (Any): The input data to send to the app.
+            uid (str): The unique user/session identifier for tracking.
+            timeout (Optional[float]): Seconds before the request is cancelled (None waits forever).
+            on_progress (Optional[ProgressCallback]): Called periodically with the execution progress.
+            outcome (Future): The caller's future.
+        """
+        breaker = self._breakers[app_id]
+        if outcome.cancelled():
+            breaker.record_cancelled()
+            return
+
+        connection = self._connections.get(app_id) if self.is_connected(app_id) else None
         if not connection:
-            raise Exception(f"Connection not found for app ID: {app_id}")
+            breaker.record_failure()
+            if self.scoreboard is not None:
+                self.scoreboard.record(app_id, False, 0.0)
+            try:
+                outcome.set_exception(Exception(f"Connection not found for app ID: {app_id}"))
+            except InvalidStateError:
+                pass
+            return
 
+        started = time.monotonic()
         try:
             handler = connection.execute(data, uid)
-            result = connection.get_response(handler)
+            response = connection.get_response_async(handler, timeout, on_progress)
+        except Exception as e:
+            response = Future()
+            response.set_exception(e)
 
-            schema = self.schema(app_id, 'output')
-            marshmallow = json_schema_to_marshmallow(schema)
-            handle_resources = has_resource_fields(marshmallow())
+        # Cancelling the call cancels the proxy request too
+        outcome.add_done_callback(lambda future: response.cancel() if future.cancelled() else None)
+        response.add_done_callback(lambda _: self._schedule_completion(app_id, connection, started, response, outcome))
 
-            if handle_resources:
-                result = resolve_resources("https://" + app_id + "/resource?reid={reid}", result, marshmallow())
+    # ----------------------------------------------------------------------
+    def _schedule_completion(self, app_id: str, connection: Remote, started: float, response: Future,
+                             outcome: Future) -> None:
+        """
+        Completes a call on the completion executor, or right away if the stub was closed.
+        """
+        try:
+            self._completion_executor.submit(self._complete_call, app_id, connection, started, response, outcome)
+        except RuntimeError:
+            self._complete_call(app_id, connection, started, response, outcome)
+
+    # ----------------------------------------------------------------------
+    def _complete_call(self, app_id: str, connection: Remote, started: float, response: Future, outcome: Future) -> None:
+        """
+        Finishes a call once the app answered: downloads resource fields, updates the
+        breaker, metrics and scoreboard, and settles the caller's future.
+
+        Args:
+            app_id (str): The application ID that was called.
+            connection (Remote): The connection the request was sent on.
+            started (float): Monotonic time the request was sent.
+            response (Future): The settled response future of the Remote.
+            outcome (Future): The caller's future, settled with the output or None.
+        """
+        breaker = self._breakers[app_id]
+        if response.cancelled():
+            breaker.record_cancelled()
+            REMOTE_CALL_SECONDS.observe(time.monotonic() - started, app_id=app_id, outcome='cancelled')
+            logging.info(f"[{app_id}] Call cancelled")
+            return
 
-            return result
+        result = None
+        try:
+            result = response.result()
+
+            marshmallow, handle_resources, resource_fields = self._output_schema(app_id)
+            if handle_resources:
+                if resource_fields:
+                    result = self._resolve_resources(app_id, result, resource_fields)
+                else:
+                    # Nested resource fields: let the SDK walk the schema
+                    result = resolve_resources(self.url(app_id) + "/resource?reid={reid}", result, marshmallow)
         except Exception as e:
+            result = None
             logging.error(f"[{app_id}] Execution failed: {e}")
+            if not connection.is_connected():
+                with self._lock:
+                    if self._connections.get(app_id) is connection:
+                        self._drop(app_id)
+        finally:
+            latency = time.monotonic() - started
+            if result is not None:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            REMOTE_CALL_SECONDS.observe(latency, app_id=app_id, outcome='success' if result is not None else 'failure')
+            if self.scoreboard is not None:
+                self.scoreboard.record(app_id, result is not None, latency)
+            try:
+                outcome.set_result(result)
+            except InvalidStateError:
+                # The caller cancelled while the resources were downloading
+                pass
+
+    # ----------------------------------------------------------------------
+    def _output_schema(self, app_id: str) -> Tuple[Any, bool, List[str]]:
+        """
+        Returns the compiled output schema of an app, compiling it on first use.
+
+        Args:
+            app_id (str): The application ID.
+
+        Returns:
+            Tuple[Any, bool, List[str]]: The marshmallow schema instance, whether it has
+            resource fields, and the names of its top-level resource fields (plain or
+            lists of resources). The list is empty if resources are only nested.
+        """
+        compiled = self._output_schemas.get(app_id)
+        if compiled is None:
+            marshmallow = json_schema_to_marshmallow(self.schema(app_id, 'output'))()
+            resource_fields = [name for name, field in marshmallow.fields.items()
+                               if isinstance(field, Resource) or isinstance(getattr(field, 'inner', None), Resource)]
+            compiled = (marshmallow, has_resource_fields(marshmallow), resource_fields)
+            self._output_schemas[app_id] = compiled
+        return compiled
+
+    # ----------------------------------------------------------------------
+    def _resolve_resources(self, app_id: str, result: dict, resource_fields: List[str]) -> dict:
+        """
+        Replaces the resource references of a result with their content, downloading
+        all of them concurrently over the pooled session.
+
+        Args:
+            app_id (str): The application ID that produced the result.
+            result (dict): The raw output, holding resource IDs in its resource fields.
+            resource_fields (List[str]): Top-level fields holding a resource ID or a list of them.
+
+        Returns:
+            dict: A copy of the result with the downloaded bytes in place of the IDs.
+
+        Raises:
+            requests.RequestException: If a resource cannot be downloaded.
+        """
+        url = self.url(app_id) + "/resource?reid={reid}"
+        downloads: List[Tuple[str, Optional[int], str]] = []
+        for name in resource_fields:
+            value = result.get(name)
+            if isinstance(value, list):
+                downloads.extend((name, index, reid) for index, reid in enumerate(value) if reid is not None)
+            elif value is not None:
+                downloads.append((name, None, value))
+
+        if len(downloads) == 1:
+            contents = [self._fetch_resource(url.format(reid=downloads[0][2]))]
+        else:
+            contents = list(self._resource_executor.map(lambda download: self._fetch_resource(url.format(reid=download[2])), downloads))
+
+        resolved = dict(result)
+        for name in {name for name, index, _ in downloads if index is not None}:
+            resolved[name] = list(resolved[name])
+        for (name, index, _), content in zip(downloads, contents):
+            if index is None:
+                resolved[name] = content
+            else:
+                resolved[name][index] = content
+        return resolved
+
+    # ----------------------------------------------------------------------
+    def _fetch_resource(self, url: str) -> bytes:
+        """
+        Downloads one resource.
+
+        Args:
+            url (str): The resource URL.
+
+        Returns:
+            bytes: The resource content.
+        """
+        response = self._session.get(url, timeout=RESOURCE_TIMEOUT)
+        response.raise_for_status()
+        return response.content
+
+    # ----------------------------------------------------------------------
+    def rank(self, app_ids: List[str]) -> List[str]:
+        """
+        Orders equivalent apps by their recorded success rate and latency.
+
+        Args:
+            app_ids (List[str]): Candidate application IDs in default order.
+
+        Returns:
+            List[str]: The IDs best first, or unchanged if there is no scoreboard.
+        """
+        if self.scoreboard is None:
+            return list(app_ids)
+        return self.scoreboard.rank(app_ids)
+
+    # ----------------------------------------------------------------------
+    def call_first(self, app_ids: List[str], data: Any, uid: str = 'super-user',
+                   hedge_delay: Optional[float] = None,
+                   accept: Optional[Callable[[dict], bool]] = None,
+                   attempts: Optional[List[dict]] = None,
+                   timeout: Optional[float] = DEFAULT_CALL_TIMEOUT,
+                   on_progress: Optional[ProgressCallback] = None,
+                   cancel_token: Optional[CancellationToken] = None) -> Tuple[Optional[str], Optional[dict]]:
+        """
+        Sends the same request to several equivalent apps, in order of preference,
+        and returns the first acceptable result. The next app is contacted as soon
+        as the previous one fails or, when `hedge_delay` is set, once the apps already
+        contacted have not answered within that many seconds. Slower calls still
+        running when a result is accepted are cancelled.
+
+        Args:
+            app_ids (List[str]): Candidate application IDs, most preferred first.
+            data (Any): The input data to send to each app.
+            uid (str): The unique user/session identifier for tracking (default: 'super-user').
+            hedge_delay (Optional[float]): Seconds to wait before hedging to the next app.
+                None only moves on when an app fails.
+            accept (Optional[Callable[[dict], bool]]): Validates a result (default: any
+                non-empty result is accepted).
+            attempts (Optional[List[dict]]): If given, one entry per finished call is
+                appended with its `app_id`, `seconds` and `outcome`.
+            timeout (Optional[float]): Seconds each app may take before its request is cancelled.
+            on_progress (Optional[ProgressCallback]): Called periodically with the progress of each call.
+            cancel_token (Optional[CancellationToken]): Cancelling it cancels every call in flight.
+
+        Returns:
+            Tuple[Optional[str], Optional[dict]]: The app ID that answered and its output,
+            or (None, None) if every app failed.
+
+        Raises:
+            OperationCancelledError: If the token was cancelled before an app answered.
+        """
+        accept = accept or bool
+        remaining = list(app_ids)
+        started: Dict[Future, float] = {}
+        running: Dict[Future, str] = {}
+
+        while remaining or running:
+            if cancel_token is not None and cancel_token.cancelled:
+                for future in running:
+                    future.cancel()
+                raise OperationCancelledError(cancel_token.reason)
+
+            # Contact the next app: first pass, after a failure, or when the hedge delay expired
+            if remaining:
+                app_id = remaining.pop(0)
+                logging.info(f"[{app_id}] Sending request ({len(running)} other call(s) in flight)")
+                try:
+                    future = self.call_async(app_id, data, uid, timeout, on_progress, cancel_token)
+                except Exception as e:
+                    future = Future()
+                    future.set_exception(e)
+                running[future] = app_id
+                started[future] = time.monotonic()
+
+            done, _ = wait(list(running), timeout=hedge_delay if remaining else None,
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                logging.info(f"No answer after {hedge_delay}s, hedging to the next app")
+
+            for future in done:
+                app_id = running.pop(future)
+                attempt = {'app_id': app_id, 'seconds': round(time.monotonic() - started[future], 3)}
+                if attempts is not None:
+                    attempts.append(attempt)
+                try:
+                    result = future.result()
+                except CancelledError:
+                    attempt['outcome'] = 'cancelled'
+                    continue
+                except Exception as e:
+                    attempt['outcome'] = 'error'
+                    logging.warning(f"[{app_id}] Call failed: {e}")
+                    continue
+                if result and accept(result):
+                    attempt['outcome'] = 'accepted'
+                    if running:
+                        logging.info(f"[{app_id}] Answered first, cancelling {list(running.values())}")
+                        for loser in running:
+                            loser.cancel()
+                    return app_id, result
+                attempt['outcome'] = 'rejected'
+                logging.warning(f"[{app_id}] Returned no usable result")
+
+        return None, None
 
     # ----------------------------------------------------------------------
     def manifest(self, app_id: str) -> dict:
@@ -139,3 +765,63 @@ class Stub:
             return _output
         else:
             raise ValueError("Type must be either 'input' or 'output'")
+
+
+# Process-wide stub shared by every pipeline run
+_shared_stub: Optional[Stub] = None
+_shared_stub_options: Dict[str, Any] = {}
+_shared_stub_lock = threading.Lock()
+
+
+def configure_shared_stub(**options: Any) -> None:
+    """
+    Sets the Stub options (e.g. `url_template`, `remote_factory`) the shared stub is
+    created with. The current shared stub, if any, is closed and replaced on next use.
+
+    Args:
+        **options (Any): Keyword arguments passed to the Stub constructor.
+    """
+    global _shared_stub
+    with _shared_stub_lock:
+        _shared_stub_options.clear()
+        _shared_stub_options.update(options)
+        previous, _shared_stub = _shared_stub, None
+    if previous is not None:
+        previous.close()
+
+
+def shared_stub(app_ids: List[str]) -> Stub:
+    """
+    Returns the process-wide Stub, registering any app IDs it does not know yet.
+    Manifests, schemas and connections are kept between calls. Apps that are not
+    connected start initializing concurrently in the background; each one is
+    reconnected if its connection drops.
+
+    Args:
+        app_ids (List[str]): Application identifiers the caller is going to use.
+
+    Returns:
+        Stub: The shared stub instance.
+    """
+    global _shared_stub
+    with _shared_stub_lock:
+        if _shared_stub is None:
+            options = {'scoreboard': Scoreboard(), **_shared_stub_options}
+            _shared_stub = Stub(app_ids, lazy=True, **options)
+        stub = _shared_stub
+    stub.warm_up(app_ids)
+    return stub
+
+
+def _export_shared_stub_metrics() -> None:
+    """
+    Metrics collector exporting the breaker gauges of the current shared stub only.
+    """
+    stub = _shared_stub
+    CIRCUIT_STATE.clear()
+    CIRCUIT_FAILURES.clear()
+    if stub is not None:
+        stub.export_metrics()
+
+
+registry.add_collector(_export_shared_stub_metrics)
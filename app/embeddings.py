@@ -0,0 +1,192 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ollama_client import ollama
+
+# Ollama model computing the prompt embeddings (pulled by ollama-entrypoint.sh)
+EMBEDDING_MODEL = os.environ.get('OLLAMA_EMBED_MODEL', 'nomic-embed-text')
+EMBEDDING_TIMEOUT = float(os.environ.get('OLLAMA_EMBED_TIMEOUT', 30))
+# Set to 0 to store memories without embeddings (similarity then falls back to word overlap)
+EMBEDDINGS_ENABLED = os.environ.get('MEMORY_EMBEDDINGS', '1') not in ('0', 'false', 'no')
+
+
+def to_blob(vector: np.ndarray) -> bytes:
+    """Serialize an embedding as little-endian float32 bytes"""
+    return np.asarray(vector, dtype='<f4').tobytes()
+
+
+def from_blob(blob: bytes) -> np.ndarray:
+    """Read an embedding stored with to_blob"""
+    return np.frombuffer(blob, dtype='<f4')
+
+
+class Embedder:
+    """
+    Computes prompt embeddings through Ollama
+
+    Features:
+    - Small LRU cache, so a prompt looked up at the start of a run is not embedded again when stored
+    - Failures are logged and return None: callers fall back to lexical similarity
+    """
+
+    def __init__(self,
+                 model: str = EMBEDDING_MODEL,
+                 timeout: float = EMBEDDING_TIMEOUT,
+                 cache_size: int = 256,
+                 enabled: bool = EMBEDDINGS_ENABLED):
+        self.model = model
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.enabled = enabled
+        self._cache: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """Return the float32 embedding of a text, or None if it could not be computed"""
+        if not self.enabled or not text.strip():
+            return None
+
+        with self._lock:
+            vector = self._cache.get(text)
+            if vector is not None:
+                self._cache.move_to_end(text)
+                return vector
+
+        try:
+            vector = np.asarray(ollama.embed(self.model, text, timeout=self.timeout), dtype=np.float32)
+        except Exception as e:
+            logging.warning(f"Could not embed text with '{self.model}': {e}")
+            return None
+        if vector.ndim != 1 or not vector.size:
+            logging.warning(f"Ollama returned an empty embedding for '{text[:50]}'")
+            return None
+
+        with self._lock:
+            self._cache[text] = vector
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
+
+
+class EmbeddingMatrix:
+    """
+    Unit-normalized embeddings kept in one contiguous float32 matrix
+
+    Rows are added and removed in place (the matrix grows by doubling, a removed row is
+    replaced by the last one), so the index follows new memories without being reloaded.
+    A search is one matrix-vector product followed by a partial sort.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self._matrix = np.zeros((max(capacity, 1), dim), dtype=np.float32)
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_rows(cls, ids: Sequence[str], blobs: Sequence[bytes]) -> Optional['EmbeddingMatrix']:
+        """Build a matrix from stored blobs in one copy; rows with another dimension than the first are skipped"""
+        if not ids:
+            return None
+        dim = len(blobs[0]) // 4
+        kept = [(memory_id, blob) for memory_id, blob in zip(ids, blobs) if len(blob) == dim * 4]
+        if len(kept) < len(ids):
+            logging.warning(f"Skipped {len(ids) - len(kept)} embeddings whose dimension is not {dim}")
+
+        index = cls(dim, capacity=len(kept) * 2)
+        vectors = np.frombuffer(b''.join(blob for _, blob in kept), dtype='<f4').reshape(len(kept), dim)
+        index._matrix[:len(kept)] = vectors
+        index._normalize(slice(0, len(kept)))
+        index._ids = [memory_id for memory_id, _ in kept]
+        index._rows = {memory_id: row for row, memory_id in enumerate(index._ids)}
+        return index
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self._rows
+
+    def ids(self) -> List[str]:
+        """Identifiers of the rows, in row order"""
+        with self._lock:
+            return list(self._ids)
+
+    def vectors(self) -> np.ndarray:
+        """The normalized rows in use (a view: copy it before adding or removing rows)"""
+        return self._matrix[:len(self._ids)]
+
+    def vector(self, memory_id: str) -> np.ndarray:
+        """Return a copy of the normalized embedding of a memory"""
+        with self._lock:
+            return self._matrix[self._rows[memory_id]].copy()
+
+    def add(self, memory_id: str, vector: np.ndarray) -> None:
+        """Insert or replace the embedding of a memory"""
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Embedding has dimension {vector.shape}, index expects {self.dim}")
+
+        with self._lock:
+            row = self._rows.get(memory_id)
+            if row is None:
+                row = len(self._ids)
+                if row == len(self._matrix):
+                    grown = np.zeros((len(self._matrix) * 2, self.dim), dtype=np.float32)
+                    grown[:row] = self._matrix[:row]
+                    self._matrix = grown
+                self._ids.append(memory_id)
+                self._rows[memory_id] = row
+            self._matrix[row] = vector
+            self._normalize(slice(row, row + 1))
+
+    def remove(self, memory_id: str) -> bool:
+        """Remove the embedding of a memory, moving the last row into its place"""
+        with self._lock:
+            row = self._rows.pop(memory_id, None)
+            if row is None:
+                return False
+            last = len(self._ids) - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._rows[self._ids[row]] = row
+            self._ids.pop()
+            return True
+
+    def search(self, vector: np.ndarray, k: int, min_score: float = -1.0) -> List[Tuple[str, float]]:
+        """Return up to k (memory_id, cosine similarity) pairs, most similar first"""
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape != (self.dim,):
+            raise ValueError(f"Query has dimension {query.shape}, index expects {self.dim}")
+        norm = np.linalg.norm(query)
+        if not norm:
+            return []
+
+        with self._lock:
+            size = len(self._ids)
+            if not size or k <= 0:
+                return []
+            scores = self._matrix[:size] @ (query / norm)
+            if k < size:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(size)
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[row], float(scores[row])) for row in top if scores[row] >= min_score]
+
+    def _normalize(self, rows: slice) -> None:
+        """Scale rows to unit length (zero rows stay zero and never match)"""
+        block = self._matrix[rows]
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        np.divide(block, norms, out=block, where=norms > 0)
+
+
+# Global embedder instance
+embedder = Embedder()
@@ -6,22 +6,31 @@ import logging
 from PIL import Image
 import threading
 import time
+import queue
 from memory_system import memory_system  # New import
+from job_queue import JobQueue
 import json
 
 # Import the main execution function
-from main import execute
-from ontology_dc8f06af066e4a7880a5938933236037.input import InputClass
-from ontology_dc8f06af066e4a7880a5938933236037.output import OutputClass
-from openfabric_pysdk.context import AppModel
+from main import execute, LocalAppModel
+from core.metrics import start_metrics_server
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global session state
-session_state = {
-    'generation_in_progress': False
+# Generation jobs shared by all sessions (GENERATION_WORKERS pipelines run at once)
+GENERATION_WORKERS = int(os.environ.get('GENERATION_WORKERS', 2))
+
+# Pipeline metrics of the UI process (the Openfabric server exposes its own on METRICS_PORT)
+GRADIO_METRICS_PORT = int(os.environ.get('GRADIO_METRICS_PORT', int(os.environ.get('METRICS_PORT', 9100)) + 1))
+
+# Status shown while each pipeline stage runs
+STAGE_MESSAGES = {
+    'keywords': "Extracting keywords...",
+    'expansion': "Expanding prompt...",
+    'text_to_image': "Generating image...",
+    'image_to_3d': "Converting image to 3D model..."
 }
 
 def find_free_port(start_port=7860, max_attempts=100):
@@ -51,19 +60,13 @@ def find_free_port(start_port=7860, max_attempts=100):
     
     raise RuntimeError(f"Could not find free port in range {start_port}-{start_port + max_attempts} or alternative ports")
 
-def call_main_execute(prompt):
+def call_main_execute(prompt, on_progress=None, cancel_token=None):
     """Call the main execute function and wait for completion"""
     try:
-        # Create a mock AppModel with the prompt
-        class MockModel:
-            def __init__(self, prompt):
-                self.request = InputClass()
-                self.request.prompt = prompt
-                self.response = OutputClass()
-                self.expanded_prompt = ""  # Add this to store expanded prompt
-        
-        # Create model instance
-        model = MockModel(prompt)
+        # Create model instance with the prompt
+        model = LocalAppModel(prompt)
+        model.on_progress = on_progress
+        model.cancel_token = cancel_token
         
         # Call the main execute function (this handles everything)
         logger.info(f"Starting main execute with prompt: {prompt}")
@@ -71,9 +74,9 @@ def call_main_execute(prompt):
         
         logger.info("Main execute completed")
         
-        # Try to extract expanded prompt from the response message
-        expanded_prompt = ""
-        if hasattr(model.response, 'message') and model.response.message:
+        # Prefer the expanded prompt reported by execute
+        expanded_prompt = model.outcome.get('expanded_prompt', "")
+        if not expanded_prompt and hasattr(model.response, 'message') and model.response.message:
             # Look for expanded prompt in the response message
             lines = model.response.message.split('\n')
             for line in lines:
@@ -84,134 +87,80 @@ def call_main_execute(prompt):
                         break
         
         return (model.response.message if hasattr(model.response, 'message') else "Generation completed", 
-                expanded_prompt)
+                expanded_prompt,
+                model.outcome)
         
     except Exception as e:
         logger.error(f"Error calling main execute: {e}")
-        return f"Error: {str(e)}", ""
+        return f"Error: {str(e)}", "", {}
 
-def find_latest_generated_image():
-    """Find the most recently generated image"""
-    try:
-        latest_image = None
-        latest_time = 0
-        
-        # Check current directory first
-        # for img_name in ["output.png", "image.png", "generated.png"]:
-        #     if os.path.exists(img_name):
-        #         mod_time = os.path.getmtime(img_name)
-        #         if mod_time > latest_time:
-        #             latest_time = mod_time
-        #             latest_image = img_name
-        
-        # Check memories directory
-        memories_dir = "memories"
-        if os.path.exists(memories_dir):
-            # Get today's folder first
-            today = datetime.now().strftime("%Y-%m-%d")
-            today_path = os.path.join(memories_dir, today)
-            
-            folders_to_check = []
-            if os.path.exists(today_path):
-                folders_to_check.append(today_path)
-            
-            # Add other date folders
-            for date_folder in os.listdir(memories_dir):
-                date_path = os.path.join(memories_dir, date_folder)
-                if os.path.isdir(date_path) and date_path != today_path:
-                    folders_to_check.append(date_path)
-            
-            for date_path in folders_to_check:
-                # Sort creation folders by modification time (newest first)
-                creation_folders = []
-                for creation_folder in os.listdir(date_path):
-                    creation_path = os.path.join(date_path, creation_folder)
-                    if os.path.isdir(creation_path):
-                        creation_folders.append((creation_path, os.path.getmtime(creation_path)))
-                
-                creation_folders.sort(key=lambda x: x[1], reverse=True)
-                
-                for creation_path, _ in creation_folders:
-                    for img_name in ["image.png", "output.png", "generated.png"]:
-                        img_path = os.path.join(creation_path, img_name)
-                        if os.path.exists(img_path):
-                            mod_time = os.path.getmtime(img_path)
-                            if mod_time > latest_time:
-                                latest_time = mod_time
-                                latest_image = img_path
-        
-        return latest_image
-        
-    except Exception as e:
-        logger.error(f"Error finding latest image: {e}")
-        return None
+def run_generation_job(job):
+    """Run a queued generation job, publishing its progress on the job"""
+    return call_main_execute(job.prompt, on_progress=lambda stage, text: job.updates.put((stage, text)),
+                             cancel_token=job.token)
 
-def find_latest_generated_glb():
-    """Find the most recently generated GLB file"""
-    try:
-        latest_glb = None
-        latest_time = 0
-        
-        # Check current directory first
-        # for glb_name in ["output.glb", "model.glb", "generated.glb"]:
-        #     if os.path.exists(glb_name):
-        #         mod_time = os.path.getmtime(glb_name)
-        #         if mod_time > latest_time:
-        #             latest_time = mod_time
-        #             latest_glb = glb_name
-        
-        # Check memories directory
-        memories_dir = "memories"
-        if os.path.exists(memories_dir):
-            for date_folder in os.listdir(memories_dir):
-                date_path = os.path.join(memories_dir, date_folder)
-                if os.path.isdir(date_path):
-                    for creation_folder in os.listdir(date_path):
-                        creation_path = os.path.join(date_path, creation_folder)
-                        if os.path.isdir(creation_path):
-                            for glb_name in ["model.glb", "output.glb", "generated.glb"]:
-                                glb_path = os.path.join(creation_path, glb_name)
-                                if os.path.exists(glb_path):
-                                    mod_time = os.path.getmtime(glb_path)
-                                    if mod_time > latest_time:
-                                        latest_time = mod_time
-                                        latest_glb = glb_path
-        
-        return latest_glb
-        
-    except Exception as e:
-        logger.error(f"Error finding latest GLB: {e}")
-        return None
+generation_queue = JobQueue(run_generation_job, workers=GENERATION_WORKERS)
 
-def generate_content(prompt):
-    """Generate content and return all results at once"""
+def generate_content(prompt, request: gr.Request = None):
+    """Queue a generation job and stream its queue position and progress until all results are ready"""
     if not prompt.strip():
-        return "Please enter a prompt", None, "No generation started", None, ""
-    
-    if session_state['generation_in_progress']:
-        return "Generation already in progress", None, "Please wait for current generation to complete", None, ""
-    
-    # Set generation flag
-    session_state['generation_in_progress'] = True
+        yield "Please enter a prompt", None, "No generation started", None, ""
+        return
     
     try:
-        # Call main execute and wait for completion
-        result_message, expanded_prompt = call_main_execute(prompt)
+        session_id = request.session_hash if request is not None and request.session_hash else "anonymous"
+        job = generation_queue.submit(session_id, prompt)
+        
+        # Report the queue position until a worker picks the job up
+        position = generation_queue.position(job.id)
+        while position > 0:
+            yield (f"Queued (job {job.id}): position {position} in queue", gr.update(), gr.update(), gr.update(),
+                   f"ORIGINAL PROMPT:\n{prompt}\n\nWaiting for a free generation slot...")
+            job.done.wait(timeout=1.0)
+            position = generation_queue.position(job.id)
+        
+        # Relay the pipeline progress while the job runs
+        partial_expansion = ""
+        while not job.done.is_set() or not job.updates.empty():
+            try:
+                pending = [job.updates.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            # Only display the latest state when updates arrive faster than we render
+            while not job.updates.empty():
+                pending.append(job.updates.get_nowait())
+            
+            detail = ""
+            for stage, text in pending:
+                if stage == 'expansion':
+                    partial_expansion = text
+                else:
+                    # Openfabric stages report the remote execution status
+                    detail = f" [{text}]" if text else ""
+            
+            yield (f"{STAGE_MESSAGES.get(stage, 'Generating...')}{detail} (job {job.id})", gr.update(), gr.update(), gr.update(),
+                   f"ORIGINAL PROMPT:\n{prompt}\n\nEXPANDED PROMPT:\n{partial_expansion}")
+        
+        if job.status == 'cancelled':
+            yield f"Generation cancelled (job {job.id})", None, "Generation cancelled", None, ""
+            return
         
-        # If we didn't get expanded prompt from response, try to find it in details file
-        if not expanded_prompt:
-            expanded_prompt = find_expanded_prompt_in_files()
+        result_message, expanded_prompt, outcome = job.result or (f"Generation failed: {job.error}", "", {})
+        if not outcome:
+            # Only show files of this job: the latest ones on disk may belong to another session
+            yield result_message, None, "No 3D model generated", None, f"ORIGINAL PROMPT:\n{prompt}"
+            return
         
         # Create prompt comparison display
         prompt_comparison = f"""ORIGINAL PROMPT:
 {prompt}
 
 EXPANDED PROMPT:
-{expanded_prompt if expanded_prompt else 'Not available - check details.txt file'}"""
+{expanded_prompt if expanded_prompt else 'Not available'}"""
         
         # After completion, find the generated files
         image = None
-        image_path = find_latest_generated_image()
+        image_path = outcome.get('image_path')
         if image_path:
             try:
                 image = Image.open(image_path)
@@ -223,7 +172,7 @@ EXPANDED PROMPT:
         glb_info = "No 3D model generated"
         glb_file = None
         
-        glb_path = find_latest_generated_glb()
+        glb_path = outcome.get('model_path')
         if glb_path:
             try:
                 file_size = os.path.getsize(glb_path)
@@ -248,76 +197,11 @@ CONTROLS:
                 logger.error(f"Error processing GLB: {e}")
                 glb_info = f"Error processing 3D model: {e}"
         
-        return result_message, image, glb_info, glb_file, prompt_comparison
+        yield result_message, image, glb_info, glb_file, prompt_comparison
         
     except Exception as e:
         logger.error(f"Error in generation: {e}")
-        return f"Generation failed: {str(e)}", None, "Generation failed", None, ""
-    
-    finally:
-        session_state['generation_in_progress'] = False
-
-def find_expanded_prompt_in_files():
-    """Find the expanded prompt in the most recent details.txt file"""
-    try:
-        memories_dir = "memories"
-        if not os.path.exists(memories_dir):
-            return ""
-        
-        # Get today's folder first
-        today = datetime.now().strftime("%Y-%m-%d")
-        today_path = os.path.join(memories_dir, today)
-        
-        folders_to_check = []
-        if os.path.exists(today_path):
-            folders_to_check.append(today_path)
-        
-        # Add other recent date folders
-        for date_folder in sorted(os.listdir(memories_dir), reverse=True)[:3]:  # Check last 3 days
-            date_path = os.path.join(memories_dir, date_folder)
-            if os.path.isdir(date_path) and date_path != today_path:
-                folders_to_check.append(date_path)
-        
-        for date_path in folders_to_check:
-            # Get most recent creation folder
-            creation_folders = []
-            for creation_folder in os.listdir(date_path):
-                creation_path = os.path.join(date_path, creation_folder)
-                if os.path.isdir(creation_path):
-                    creation_folders.append((creation_path, os.path.getmtime(creation_path)))
-            
-            if creation_folders:
-                creation_folders.sort(key=lambda x: x[1], reverse=True)
-                most_recent_folder = creation_folders[0][0]
-                
-                details_file = os.path.join(most_recent_folder, "details.txt")
-                if os.path.exists(details_file):
-                    with open(details_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        
-                    # Extract expanded prompt from details file
-                    lines = content.split('\n')
-                    in_expanded_section = False
-                    expanded_lines = []
-                    
-                    for line in lines:
-                        if line.strip() == "EXPANDED PROMPT:":
-                            in_expanded_section = True
-                            continue
-                        elif line.strip() == "KEYWORDS:" or line.strip() == "FILES:":
-                            in_expanded_section = False
-                            break
-                        elif in_expanded_section and line.strip():
-                            expanded_lines.append(line.strip())
-                    
-                    if expanded_lines:
-                        return ' '.join(expanded_lines)
-        
-        return ""
-        
-    except Exception as e:
-        logger.error(f"Error finding expanded prompt in files: {e}")
-        return ""
+        yield f"Generation failed: {str(e)}", None, "Generation failed", None, ""
 
 def load_recent_creations():
     """Load recent creations from memory system"""
@@ -427,9 +311,12 @@ def navigate_creation(current_id, direction):
         logger.error(f"Error navigating creation: {e}")
         return current_id
 
-def reset_session():
-    """Reset the current session"""
-    session_state['generation_in_progress'] = False
+def reset_session(request: gr.Request = None):
+    """Reset the current session, cancelling its queued and running generations"""
+    session_id = request.session_hash if request is not None and request.session_hash else "anonymous"
+    cancelled = generation_queue.cancel_session(session_id)
+    if cancelled:
+        return f"Session reset! Cancelled {cancelled} generation(s).", None, "Session reset - no files loaded", None, ""
     return "Session reset!", None, "Session reset - no files loaded", None, ""
 
 def create_interface():
@@ -546,15 +433,17 @@ def create_interface():
                 current_creation_id = gr.State(value="")
         
         # Event handlers for main generation
-        generate_btn.click(
+        generate_event = generate_btn.click(
             fn=generate_content,
             inputs=[prompt_input],
             outputs=[status_display, generated_image, glb_info_display, glb_viewer, prompt_comparison]
         )
         
+        # Reset also stops streaming the progress of the cancelled generation
         reset_btn.click(
             fn=reset_session,
-            outputs=[status_display, generated_image, glb_info_display, glb_viewer, prompt_comparison]
+            outputs=[status_display, generated_image, glb_info_display, glb_viewer, prompt_comparison],
+            cancels=[generate_event]
         )
         
         # Event handlers for recent creations
@@ -595,9 +484,13 @@ def create_interface():
             outputs=[creation_dropdown, recent_status]
         )
     
+    # Queueing is required to stream progress from generator event handlers; allow enough
+    # concurrent handlers for every waiting job (the pipelines themselves are bounded by the job queue)
+    demo.queue(concurrency_count=max(GENERATION_WORKERS * 8, 16))
     return demo
 
 if __name__ == "__main__":
+    start_metrics_server(GRADIO_METRICS_PORT)
     try:
         # Check for environment variable first
         port = int(os.environ.get('GRADIO_SERVER_PORT', 7860))
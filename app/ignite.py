@@ -3,7 +3,10 @@ import threading
 import time
 import logging
 import socket
+import os
 from openfabric_pysdk.starter import Starter
+from ollama_client import ollama
+from core.metrics import start_metrics_server
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -32,11 +35,18 @@ def start_gradio_ui():
 
 if __name__ == '__main__':
     PORT = 8888
+    METRICS_PORT = int(os.environ.get('METRICS_PORT', 9100))
     
     # Start Gradio UI in background thread
     ui_thread = threading.Thread(target=start_gradio_ui, daemon=True)
     ui_thread.start()
     
+    # Load the LLM in the background so the first request does not pay the cold start
+    threading.Thread(target=ollama.warm_up, daemon=True).start()
+    
+    # Expose per-stage latency metrics for Prometheus
+    start_metrics_server(METRICS_PORT)
+    
     # Small delay to let Gradio start
     time.sleep(2)
     
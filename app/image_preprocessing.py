@@ -0,0 +1,151 @@
+import io
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from PIL import Image
+
+from core.metrics import registry
+
+# Processing path of each image, exported as a label
+PASSTHROUGH = 'passthrough'
+CONVERTED = 'converted'
+RESIZED = 'resized'
+FALLBACK = 'fallback'
+
+PREPROCESSING_SECONDS = registry.histogram('image_preprocessing_seconds', 'Image preprocessing time before the 3D stage, by path',
+                                           ['path'], buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+PREPROCESSING_SAVED_SECONDS = registry.counter('image_preprocessing_saved_seconds_total',
+                                               'Estimated preprocessing time saved by passing compliant images through')
+
+
+@dataclass
+class PreparedImage:
+    """An image ready to be sent to the image-to-3D apps"""
+    data: bytes
+    path: str
+    seconds: float
+    size: tuple
+    mode: str
+
+
+class ImagePreprocessor:
+    """
+    Prepares generated images for the image-to-3D apps (RGB PNG, at most max_size px)
+
+    Features:
+    - Reads only the image header to decide what to do
+    - Compliant images (RGB PNG within max_size) are passed through untouched
+    - Large images are decoded at reduced scale (draft) and reduced before resampling
+    - Timing per path, with an estimate of the time saved by the passthrough
+    """
+
+    def __init__(self,
+                 max_size: int = int(os.environ.get('IMAGE_MAX_SIZE', 1024)),
+                 compress_level: int = int(os.environ.get('IMAGE_PNG_COMPRESS_LEVEL', 6))):
+        self.max_size = max_size
+        self.compress_level = compress_level
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._reference_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def prepare(self, image_data: bytes) -> PreparedImage:
+        """Return the image as an RGB PNG within max_size, re-encoding only when needed"""
+        started = time.perf_counter()
+        try:
+            # Image.open only parses the header; pixels are decoded on first access
+            image = Image.open(io.BytesIO(image_data))
+            size, mode = image.size, image.mode
+
+            if image.format == 'PNG' and mode == 'RGB' and max(size) <= self.max_size:
+                prepared = PreparedImage(image_data, PASSTHROUGH, 0.0, size, mode)
+            else:
+                prepared = self._convert(image)
+        except Exception as e:
+            logging.error(f"Error processing image: {e}")
+            # Fallback to original data
+            prepared = PreparedImage(image_data, FALLBACK, 0.0, (0, 0), '')
+
+        prepared.seconds = time.perf_counter() - started
+        if prepared.path == PASSTHROUGH and self._reference_seconds is None:
+            self._reference_seconds = 0.0
+            threading.Thread(target=self._calibrate, args=(image_data,), daemon=True).start()
+        self._record(prepared)
+        logging.info(f"Image preprocessing: {prepared.path}, {len(prepared.data)} bytes, "
+                     f"size: {prepared.size}, {prepared.seconds * 1000:.1f} ms")
+        return prepared
+
+    def _convert(self, image: Image.Image) -> PreparedImage:
+        """Decode, flatten to RGB, shrink and re-encode an image that is not compliant"""
+        original_mode = image.mode
+        path = CONVERTED
+        if max(image.size) > self.max_size:
+            path = RESIZED
+            # Let JPEG decode directly at a reduced scale (no-op for other formats)
+            image.draft('RGB', (self.max_size, self.max_size))
+
+        # Convert to RGB if necessary
+        if image.mode == 'RGBA':
+            logging.info(f"Converting image from {image.mode} to RGB")
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+        elif image.mode != 'RGB':
+            logging.info(f"Converting image from {image.mode} to RGB")
+            image = image.convert('RGB')
+
+        # Resize if too large: integer reduce first, then LANCZOS for the remainder
+        if max(image.size) > self.max_size:
+            logging.info(f"Resizing image from {image.size} to fit {self.max_size}px")
+            image.thumbnail((self.max_size, self.max_size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+        png_buffer = io.BytesIO()
+        image.save(png_buffer, format='PNG', compress_level=self.compress_level)
+        return PreparedImage(png_buffer.getvalue(), path, 0.0, image.size, original_mode)
+
+    def _calibrate(self, image_data: bytes):
+        """Time the full decode and re-encode of a compliant image once (in the background), as the cost a passthrough avoids"""
+        started = time.perf_counter()
+        try:
+            self._convert(Image.open(io.BytesIO(image_data)))
+        except Exception as e:
+            logging.warning(f"Image preprocessing calibration failed: {e}")
+            return
+        self._reference_seconds = time.perf_counter() - started
+
+    def _record(self, prepared: PreparedImage):
+        """Update per-path timing and the time saved by the passthrough"""
+        PREPROCESSING_SECONDS.observe(prepared.seconds, path=prepared.path)
+        with self._lock:
+            stats = self._stats.setdefault(prepared.path, {'count': 0, 'seconds': 0.0})
+            stats['count'] += 1
+            stats['seconds'] += prepared.seconds
+
+            # A passthrough saves what re-encoding a compliant image costs (average of converted images,
+            # or the one-off calibration when none was converted yet)
+            converted = self._stats.get(CONVERTED)
+            reference = converted['seconds'] / converted['count'] if converted else self._reference_seconds
+            if prepared.path == PASSTHROUGH and reference is not None:
+                saved = max(reference - prepared.seconds, 0.0)
+                stats['saved_seconds'] = stats.get('saved_seconds', 0.0) + saved
+                PREPROCESSING_SAVED_SECONDS.inc(saved)
+
+    def stats(self) -> Dict[str, Any]:
+        """Images, total and average time per path, and the estimated time saved"""
+        with self._lock:
+            return {
+                path: {
+                    'count': stats['count'],
+                    'seconds': round(stats['seconds'], 4),
+                    'average_ms': round(stats['seconds'] / stats['count'] * 1000, 2),
+                    'saved_seconds': round(stats.get('saved_seconds', 0.0), 4)
+                }
+                for path, stats in self._stats.items()
+            }
+
+
+# Global image preprocessor instance
+image_preprocessor = ImagePreprocessor()
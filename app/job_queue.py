@@ -0,0 +1,168 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from core.cancellation import CancellationToken
+
+
+@dataclass
+class Job:
+    """A generation request waiting in or processed by the job queue"""
+    id: str
+    session_id: str
+    prompt: str
+    status: str = 'queued'  # queued, running, done, failed, cancelled
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+    # Progress events (stage, text) published while the job runs
+    updates: "queue.Queue" = field(default_factory=queue.Queue)
+    done: threading.Event = field(default_factory=threading.Event)
+    # Cancelled when the job is abandoned; the run function should stop and release its resources
+    token: CancellationToken = field(default_factory=CancellationToken)
+
+
+class JobQueue:
+    """
+    Generation job queue
+
+    Features:
+    - Configurable number of worker threads running jobs concurrently
+    - Per-job IDs and queue position reporting
+    - Fair ordering: sessions take turns, so one session cannot starve the others
+    - Cancellation of queued jobs (dropped) and running jobs (their token is cancelled)
+    """
+
+    def __init__(self, run: Callable[[Job], Any], workers: int = 2):
+        """
+        Args:
+            run: Function executing a job; its return value becomes job.result
+            workers: Number of jobs processed at the same time
+        """
+        self.run = run
+        self.workers = workers
+        self._sessions: "OrderedDict[str, Deque[Job]]" = OrderedDict()
+        self._jobs: Dict[str, Job] = {}
+        self._condition = threading.Condition()
+
+        for index in range(workers):
+            threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True).start()
+        logging.info(f"Job queue started with {workers} workers")
+
+    def submit(self, session_id: str, prompt: str) -> Job:
+        """Queue a new job for a session"""
+        job = Job(id=uuid.uuid4().hex[:12], session_id=session_id, prompt=prompt)
+        with self._condition:
+            self._jobs[job.id] = job
+            self._sessions.setdefault(session_id, deque()).append(job)
+            self._condition.notify()
+        logging.info(f"Job {job.id} queued for session {session_id} (position {self.position(job.id)})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by ID"""
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def position(self, job_id: str) -> int:
+        """Return how many jobs will start before this one (0 once it is running or finished)"""
+        with self._condition:
+            for index, job in enumerate(self._pending_order()):
+                if job.id == job_id:
+                    return index + 1
+        return 0
+
+    def cancel(self, job_id: str, reason: str = "cancelled") -> bool:
+        """Cancel a job: a queued job never starts, a running job has its token cancelled"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ('queued', 'running'):
+                return False
+            if job.status == 'queued':
+                jobs = self._sessions.get(job.session_id)
+                if jobs is not None and job in jobs:
+                    jobs.remove(job)
+                    if not jobs:
+                        del self._sessions[job.session_id]
+                job.status = 'cancelled'
+                job.finished_at = time.time()
+                job.done.set()
+        # Outside the lock: cancellation callbacks close streams and cancel remote calls
+        job.token.cancel(reason)
+        logging.info(f"Job {job.id} cancelled ({reason})")
+        return True
+
+    def cancel_session(self, session_id: str, reason: str = "session reset") -> int:
+        """Cancel every queued or running job of a session, returning how many were cancelled"""
+        with self._condition:
+            job_ids = [job.id for job in self._jobs.values()
+                       if job.session_id == session_id and job.status in ('queued', 'running')]
+        return sum(self.cancel(job_id, reason) for job_id in job_ids)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of jobs in each status"""
+        with self._condition:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+    def _pending_order(self) -> List[Job]:
+        """Queued jobs in the order they will start (round-robin across sessions)"""
+        order = []
+        pending = [list(jobs) for jobs in self._sessions.values()]
+        depth = 0
+        while any(depth < len(jobs) for jobs in pending):
+            order.extend(jobs[depth] for jobs in pending if depth < len(jobs))
+            depth += 1
+        return order
+
+    def _next_job(self) -> Job:
+        """Wait for and take the next job, rotating the session to the back of the line"""
+        with self._condition:
+            while not self._sessions:
+                self._condition.wait()
+            session_id, jobs = next(iter(self._sessions.items()))
+            job = jobs.popleft()
+            del self._sessions[session_id]
+            if jobs:
+                self._sessions[session_id] = jobs
+            job.status = 'running'
+            job.started_at = time.time()
+            return job
+
+    def _work(self):
+        """Worker loop"""
+        while True:
+            job = self._next_job()
+            logging.info(f"Job {job.id} started after {job.started_at - job.created_at:.1f}s in queue")
+            try:
+                job.result = self.run(job)
+                job.status = 'cancelled' if job.token.cancelled else 'done'
+            except Exception as e:
+                job.error = str(e)
+                if job.token.cancelled:
+                    logging.info(f"Job {job.id} stopped after cancellation: {e}")
+                    job.status = 'cancelled'
+                else:
+                    logging.error(f"Job {job.id} failed: {e}")
+                    job.status = 'failed'
+            finally:
+                job.finished_at = time.time()
+                job.done.set()
+                self._forget_old_jobs()
+
+    def _forget_old_jobs(self, max_age: float = 3600):
+        """Drop finished jobs older than max_age seconds"""
+        now = time.time()
+        with self._condition:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job.finished_at and now - job.finished_at > max_age]:
+                del self._jobs[job_id]
@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import logging
+import hashlib
+import os
+import time
+from typing import Any, Dict, Optional
+
+
+class LLMCache:
+    """
+    Disk-backed cache of LLM responses
+
+    Features:
+    - Keyed by model, prompt template, input prompt and generation options
+    - Entries expire after a TTL
+    - Size-bounded: least recently used entries are evicted first
+    - SQLite storage, shared by every process using the same file
+    """
+
+    def __init__(self,
+                 db_path: str = os.environ.get('LLM_CACHE_PATH', 'app/llm_cache.db'),
+                 max_entries: int = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 5000)),
+                 ttl_seconds: float = float(os.environ.get('LLM_CACHE_TTL', 7 * 24 * 3600))):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.init_database()
+        logging.info("LLM cache initialized")
+
+    def init_database(self):
+        """Initialize SQLite table for cached responses"""
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)
+            """)
+
+    @staticmethod
+    def make_key(model: str, template: str, prompt: str, options: Dict[str, Any] = None) -> str:
+        """Build the cache key of a generation request"""
+        content = json.dumps({
+            'model': model,
+            'template': template,
+            'prompt': prompt,
+            'options': options or {}
+        }, sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None if missing or expired"""
+        now = time.time()
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("""
+                SELECT response, created_at FROM llm_cache WHERE key = ?
+            """, (key,)).fetchone()
+
+            if row is None:
+                return None
+
+            response, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            return response
+
+    def put(self, key: str, response: str):
+        """Store a response and evict the least recently used entries beyond max_entries"""
+        if not response:
+            return
+
+        now = time.time()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_access)
+                VALUES (?, ?, ?, ?)
+            """, (key, response, now, now))
+            conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def clear(self):
+        """Remove every cached response"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+# Global LLM cache instance
+llm_cache = LLMCache()
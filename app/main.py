@@ -1,26 +1,112 @@
 import json
 import logging
 import base64
-import io
-from PIL import Image
-from typing import Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import tempfile
 import os
 import re
+import shutil
 from datetime import datetime
 
 from ontology_dc8f06af066e4a7880a5938933236037.config import ConfigClass
 from ontology_dc8f06af066e4a7880a5938933236037.input import InputClass
 from ontology_dc8f06af066e4a7880a5938933236037.output import OutputClass
 from openfabric_pysdk.context import AppModel, State
-from core.stub import Stub
+from core.cancellation import CancellationToken, OperationCancelledError
+from core.metrics import RunTimer
+from core.stub import shared_stub
 from memory_system import memory_system
-
-import requests
+from llm_cache import llm_cache
+from image_preprocessing import image_preprocessor
+from artifacts import write_bytes, write_model
+from ollama_client import ollama
 
 # Configurations dictionary for storing user configs
 configurations: Dict[str, ConfigClass] = dict()
 
+# Seconds to wait for a 3D API before also sending the image to the next one.
+# Unset means the next API is only tried after the previous one fails.
+IMAGE_TO_3D_HEDGE_DELAY = float(os.environ['IMAGE_TO_3D_HEDGE_DELAY']) if os.environ.get('IMAGE_TO_3D_HEDGE_DELAY') else None
+
+# LLM prompt templates ({prompt} is replaced by the user prompt); also part of the LLM cache key
+KEYWORDS_PROMPT_TEMPLATE = """Extract 3-5 important keywords from this prompt that describe the MAIN SUBJECT and key characteristics. Focus on nouns (objects) and important adjectives. Return ONLY the keywords separated by commas, nothing else.
+
+Examples:
+- "red sports car racing" → car, sports, red, racing
+- "blue dragon flying" → dragon, blue, flying
+- "wooden house in forest" → house, wooden, forest
+
+Prompt: "{prompt}"
+
+Keywords:"""
+EXPANSION_PROMPT_TEMPLATE = "Expand this prompt to generate a detailed image description (max 60 words): {prompt}"
+
+# Opt-in: get keywords and expanded prompt from a single JSON LLM call (falls back to two calls)
+COMBINED_LLM_CALL = os.environ.get('COMBINED_LLM_CALL', '').lower() in ('1', 'true', 'yes')
+COMBINED_PROMPT_TEMPLATE = """Analyze this image prompt and respond with a JSON object with exactly two fields:
+- "keywords": a list of 3-5 important keywords that describe the MAIN SUBJECT and key characteristics (nouns and important adjectives)
+- "expanded_prompt": the prompt expanded into a detailed image description (max 60 words)
+
+Prompt: "{prompt}"
+"""
+
+# Opt-in: answer a prompt with a previous creation when it is an exact or near-exact repeat
+REUSE_SIMILAR_CREATIONS = os.environ.get('REUSE_SIMILAR_CREATIONS', '').lower() in ('1', 'true', 'yes')
+REUSE_SIMILARITY_THRESHOLD = float(os.environ.get('REUSE_SIMILARITY_THRESHOLD', 0.9))
+
+
+class LocalAppModel:
+    """Stand-in for AppModel used by local callers (Gradio UI, scripts)"""
+
+    def __init__(self, prompt: str):
+        self.request = InputClass(prompt=prompt)
+        self.response = OutputClass()
+        # Filled by execute() with the memory ID, file paths and expanded prompt of the run
+        self.outcome: Dict[str, Any] = {}
+        # Optional callback receiving (stage, text) while the pipeline runs
+        self.on_progress: Optional[Callable[[str, str], None]] = None
+        # Optional token; cancelling it stops the run and its LLM and Openfabric calls
+        self.cancel_token: Optional[CancellationToken] = None
+
+
+def report_outcome(model: AppModel, **outcome) -> None:
+    """Expose the result of a run to callers whose model carries an outcome dict"""
+    if isinstance(getattr(model, 'outcome', None), dict):
+        model.outcome.update(outcome)
+
+
+def cancel_token_of(model: AppModel) -> Optional[CancellationToken]:
+    """Cancellation token of callers whose model carries one (None otherwise)"""
+    return getattr(model, 'cancel_token', None)
+
+
+def is_cancelled(model: AppModel) -> bool:
+    """Whether the caller abandoned this run"""
+    cancel_token = cancel_token_of(model)
+    return cancel_token is not None and cancel_token.cancelled
+
+
+def finish_cancelled(model: AppModel, timer: RunTimer, creation_folder_path: Optional[str] = None) -> None:
+    """Answer an abandoned run and remove the files it already wrote"""
+    cancel_token = cancel_token_of(model)
+    logging.info(f"Pipeline cancelled ({cancel_token.reason if cancel_token else 'no reason'})")
+    if creation_folder_path and os.path.isdir(creation_folder_path):
+        shutil.rmtree(creation_folder_path, ignore_errors=True)
+    response: OutputClass = model.response
+    response.message = "Generation cancelled."
+    report_outcome(model, cancelled=True)
+    timer.finish('cancelled')
+
+
+def report_progress(model: AppModel, stage: str, text: str = "") -> None:
+    """Forward pipeline progress (e.g. partial expanded prompt) to callers that listen for it"""
+    on_progress = getattr(model, 'on_progress', None)
+    if on_progress:
+        try:
+            on_progress(stage, text)
+        except Exception as e:
+            logging.warning(f"Progress callback failed: {e}")
+
 def create_short_folder_name(keywords: list, max_length: int = 15) -> str:
     """Create a short folder name from keywords"""
     if not keywords:
@@ -61,6 +147,199 @@ def config(configuration: Dict[str, ConfigClass], state: State) -> None:
         logging.info(f"Saving new config for user with id:'{uid}'")
         configurations[uid] = conf
 
+def remote_progress(model: AppModel, stage: str) -> Callable[[str, Any, List[str]], None]:
+    """Relay the periodic progress of an Openfabric execution as pipeline progress"""
+    def on_progress(status: str, progress: Any, messages: List[str]) -> None:
+        report_progress(model, stage, status if progress is None else f"{status}: {progress}")
+    return on_progress
+
+
+def clean_keywords(raw_keywords: List[str]) -> List[str]:
+    """Normalize LLM keywords and drop artifacts, keeping at most 5"""
+    extracted_keywords = []
+    
+    for kw in raw_keywords:
+        # Clean up keywords - remove common words and artifacts
+        clean_kw = re.sub(r'[^\w\s]', '', kw.strip().lower())  # Remove punctuation
+        clean_kw = clean_kw.strip()
+        
+        # Skip common words and artifacts
+        skip_words = ['objects', 'actions', 'styles', 'colors', 'settings', 'emotions', 'returned', 'keywords']
+        if clean_kw and len(clean_kw) > 2 and clean_kw not in skip_words:
+            extracted_keywords.append(clean_kw)
+    
+    return extracted_keywords[:5]  # Limit to 5 keywords
+
+
+def extract_keywords(model: AppModel, llm_cache_hits: Dict[str, bool]) -> List[str]:
+    """Ask LLaMA for the keywords of the prompt (empty list on failure)"""
+    request: InputClass = model.request
+    try:
+        # Stop streaming at the end of the keyword list; the cache key covers these limits too
+        options = {'max_words': 40, 'stop': ["\n\n"], 'num_predict': 64}
+        keywords_cache_key = llm_cache.make_key("llama3", KEYWORDS_PROMPT_TEMPLATE, request.prompt, options)
+        keywords_text = llm_cache.get(keywords_cache_key)
+        llm_cache_hits['keywords'] = keywords_text is not None
+
+        if keywords_text is None:
+            report_progress(model, 'keywords')
+            keywords_text = ollama.generate(
+                "llama3",
+                KEYWORDS_PROMPT_TEMPLATE.format(prompt=request.prompt),
+                timeout=60,
+                cancel_token=cancel_token_of(model),
+                **options
+            )
+            llm_cache.put(keywords_cache_key, keywords_text)
+        
+        # Parse keywords from response - be more aggressive in cleaning
+        extracted_keywords = clean_keywords([kw for kw in keywords_text.split(',') if kw.strip()])
+        
+        logging.info(f"Extracted keywords: {extracted_keywords} (cache hit: {llm_cache_hits['keywords']})")
+        return extracted_keywords
+        
+    except Exception as e:
+        logging.error(f"Error extracting keywords: {e}")
+        return []
+
+
+def expand_prompt(model: AppModel, llm_cache_hits: Dict[str, bool]) -> str:
+    """Ask LLaMA for a detailed image description of at most 60 words (original prompt on failure)"""
+    request: InputClass = model.request
+    try:
+        # Call LLaMA to expand the prompt
+        logging.info(f"Original prompt: {request.prompt}")
+        # Stream the expansion, forwarding partial text, and stop reading at 60 words
+        options = {'max_words': 60, 'num_predict': 160}
+        expansion_cache_key = llm_cache.make_key("llama3", EXPANSION_PROMPT_TEMPLATE, request.prompt, options)
+        expanded_prompt = llm_cache.get(expansion_cache_key)
+        llm_cache_hits['expansion'] = expanded_prompt is not None
+
+        if expanded_prompt is None:
+            expanded_prompt = ollama.generate(
+                "llama3",
+                EXPANSION_PROMPT_TEMPLATE.format(prompt=request.prompt),
+                timeout=180,
+                on_text=lambda text: report_progress(model, 'expansion', text),
+                cancel_token=cancel_token_of(model),
+                **options
+            )
+            llm_cache.put(expansion_cache_key, expanded_prompt)
+        else:
+            report_progress(model, 'expansion', expanded_prompt)
+        
+        # Ensure prompt doesn't exceed 60 words
+        words = expanded_prompt.split()
+        if len(words) > 60:
+            expanded_prompt = " ".join(words[:60])
+            
+        logging.info(f"Expanded prompt ({len(expanded_prompt.split())} words, cache hit: {llm_cache_hits['expansion']}): {expanded_prompt}")
+        return expanded_prompt
+
+    except Exception as e:
+        logging.error(f"Error calling LLaMA: {e}")
+        # Use original prompt as fallback
+        return request.prompt
+
+
+def parse_combined_response(text: str) -> Optional[Tuple[List[str], str]]:
+    """Validate the JSON answer of the combined call, returning (keywords, expanded prompt) or None"""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    keywords = data.get("keywords")
+    if isinstance(keywords, str):
+        keywords = keywords.split(',')
+    expanded_prompt = data.get("expanded_prompt")
+    if not isinstance(keywords, list) or not isinstance(expanded_prompt, str) or not expanded_prompt.strip():
+        return None
+
+    extracted_keywords = clean_keywords([str(kw) for kw in keywords])
+    if not extracted_keywords:
+        return None
+    return extracted_keywords, " ".join(expanded_prompt.split()[:60])
+
+
+def extract_keywords_and_expand(model: AppModel, llm_cache_hits: Dict[str, bool]) -> Optional[Tuple[List[str], str]]:
+    """Get keywords and expanded prompt from a single JSON LLaMA call (None to fall back to two calls)"""
+    request: InputClass = model.request
+    try:
+        options = {'format': "json", 'num_predict': 320}
+        cache_key = llm_cache.make_key("llama3", COMBINED_PROMPT_TEMPLATE, request.prompt, options)
+        response_text = llm_cache.get(cache_key)
+        cache_hit = response_text is not None
+
+        if response_text is None:
+            report_progress(model, 'expansion')
+            response_text = ollama.generate(
+                "llama3",
+                COMBINED_PROMPT_TEMPLATE.format(prompt=request.prompt),
+                timeout=180,
+                cancel_token=cancel_token_of(model),
+                **options
+            )
+
+        parsed = parse_combined_response(response_text)
+        if parsed is None:
+            logging.warning(f"Invalid combined LLaMA response, falling back to separate calls: {response_text[:200]}")
+            return None
+
+        llm_cache.put(cache_key, response_text)
+        llm_cache_hits['keywords'] = llm_cache_hits['expansion'] = cache_hit
+        extracted_keywords, expanded_prompt = parsed
+        report_progress(model, 'expansion', expanded_prompt)
+        logging.info(f"Combined LLaMA call (cache hit: {cache_hit}): keywords {extracted_keywords}, expanded prompt: {expanded_prompt}")
+        return parsed
+
+    except Exception as e:
+        logging.error(f"Error in combined LLaMA call, falling back to separate calls: {e}")
+        return None
+
+def reuse_creation(model: AppModel, memory, similarity: float) -> None:
+    """Link a previous creation into a new memory and answer with its files"""
+    request: InputClass = model.request
+    logging.info(f"Reusing creation {memory.id} (similarity {similarity:.2f}) for prompt: '{request.prompt}'")
+
+    memory_id = memory_system.store_memory(
+        original_prompt=request.prompt,
+        expanded_prompt=memory.expanded_prompt,
+        image_path=memory.image_path,
+        model_path=memory.model_path,
+        keywords=memory.tags,
+        metadata={
+            'model_generated': memory.metadata.get('model_generated', False),
+            'timestamp': datetime.now().strftime("%H%M%S"),
+            'creation_folder': memory.metadata.get('creation_folder'),
+            'reused_from': memory.id,
+            'similarity': similarity
+        }
+    )
+    stats = memory_system.get_memory_stats()
+
+    response: OutputClass = model.response
+    response.message = f"""Reused existing creation for prompt: '{memory.expanded_prompt}'
+
+Reused from memory: {memory.id} (similarity: {similarity:.2f})
+Files:
+- {memory.image_path}
+- {memory.model_path}
+
+Memory ID: {memory_id}
+Keywords: {', '.join(memory.tags)}
+
+Memory Stats: {stats['total_memories']} total memories stored"""
+
+    report_outcome(model,
+                   memory_id=memory_id,
+                   expanded_prompt=memory.expanded_prompt,
+                   image_path=memory.image_path,
+                   model_path=memory.model_path,
+                   reused_from=memory.id)
+
 ############################################################
 # Execution callback function
 ############################################################
@@ -75,14 +354,25 @@ def execute(model: AppModel) -> None:
     # Retrieve input prompt from the request
     request: InputClass = model.request
     logging.info(f"Starting creative pipeline with prompt: '{request.prompt}'")
+    timer = RunTimer()
 
     # MEMORY: Check for similar memories first
-    similar_memories = memory_system.find_similar(request.prompt)
+    with timer.stage('memory_lookup'):
+        similar_memories = memory_system.find_similar(request.prompt)
     if similar_memories:
         logging.info(f"Found {len(similar_memories)} similar memories:")
         for memory in similar_memories:
             logging.info(f"   - '{memory.original_prompt}' (ID: {memory.id})")
 
+    # MEMORY: Answer repeated prompts with the stored creation instead of regenerating
+    if REUSE_SIMILAR_CREATIONS:
+        with timer.stage('reuse_lookup'):
+            reusable = memory_system.find_reusable(request.prompt, REUSE_SIMILARITY_THRESHOLD)
+        if reusable:
+            reuse_creation(model, *reusable)
+            timer.finish('reused')
+            return
+
     # Retrieve super-user config
     user_config: ConfigClass = configurations.get('super-user', None)
     logging.info(f"{configurations}")
@@ -97,7 +387,7 @@ def execute(model: AppModel) -> None:
     image_to_3d_id_3 = "9f8d7ee28eb64392a0a45d231a684088.node3.openfabric.network" #back up 2
     image_to_3d_id_4 = "d35c21213aeb4bb8b69a5f5c8864aeb4.node3.openfabric.network" #back up 3
     image_to_3d_id_5 ="37aae4001f874151bfc809f647f9cde2.node3.openfabric.network"   #bak up 4
-    # List of 3D APIs to try in order of preference (working one first)
+    # List of 3D APIs in default order of preference (reordered by their recorded scores)
     image_to_3d_apis = [
         {"id": image_to_3d_id_1, "name": "3D API (Working)"},
         {"id": image_to_3d_id_2, "name": "3D API (Backup)"},
@@ -119,120 +409,73 @@ def execute(model: AppModel) -> None:
     if image_to_3d_id_5 not in app_ids:
         app_ids.append(image_to_3d_id_5)
 
-    # Initialize Stub with the app IDs
-    stub = Stub(app_ids)
-
-    # Add this right after initializing the stub
-    logging.info(f"Stub initialized with apps: {app_ids}")
-    logging.info(f"Available connections: {list(stub._connections.keys()) if hasattr(stub, '_connections') else 'No connections attribute'}")
-
-    # Test connectivity
-    for app_id in app_ids:
-        try:
-            # You might want to add a simple connectivity test here
-            logging.info(f"App {app_id} - attempting connection test")
-        except Exception as conn_error:
-            logging.error(f"Connection issue with {app_id}: {conn_error}")
-
-    # MEMORY: Extract keywords in parallel with prompt expansion
-    logging.info("Extracting keywords for memory system...")
-    extracted_keywords = []
-    try:
-        keywords_response = requests.post("http://ollama:11434/api/generate", json={
-            "model": "llama3",
-            "prompt": f"""Extract 3-5 important keywords from this prompt that describe the MAIN SUBJECT and key characteristics. Focus on nouns (objects) and important adjectives. Return ONLY the keywords separated by commas, nothing else.
-
-Examples:
-- "red sports car racing" → car, sports, red, racing
-- "blue dragon flying" → dragon, blue, flying
-- "wooden house in forest" → house, wooden, forest
-
-Prompt: "{request.prompt}"
-
-Keywords:""",
-            "stream": False
-        }, timeout=60)
-        
-        keywords_response.raise_for_status()
-        keywords_text = keywords_response.json().get("response", "").strip()
-        
-        # Parse keywords from response - be more aggressive in cleaning
-        raw_keywords = [kw.strip().lower() for kw in keywords_text.split(',') if kw.strip()]
-        extracted_keywords = []
-        
-        for kw in raw_keywords:
-            # Clean up keywords - remove common words and artifacts
-            clean_kw = re.sub(r'[^\w\s]', '', kw)  # Remove punctuation
-            clean_kw = clean_kw.strip()
-            
-            # Skip common words and artifacts
-            skip_words = ['objects', 'actions', 'styles', 'colors', 'settings', 'emotions', 'returned', 'keywords']
-            if clean_kw and len(clean_kw) > 2 and clean_kw not in skip_words:
-                extracted_keywords.append(clean_kw)
-        
-        extracted_keywords = extracted_keywords[:5]  # Limit to 5 keywords
-        
-        logging.info(f"Extracted keywords: {extracted_keywords}")
-        
-    except Exception as e:
-        logging.error(f"Error extracting keywords: {e}")
-        extracted_keywords = []
+    # Reuse the process-wide Stub; apps not connected yet start initializing in the background
+    stub = shared_stub(app_ids)
+    logging.info(f"Stub ready with apps: {app_ids}")
+    logging.info(f"Available connections: {[app_id for app_id in app_ids if stub.is_connected(app_id)]}")
+    logging.info(f"Circuit breakers: {stub.breaker_states()}")
 
     # ------------------------------
     # TODO : add your magic here
     # ------------------------------
-    try:
-        # Call LLaMA to expand the prompt
-        logging.info(f"Original prompt: {request.prompt}")
-        llama_response = requests.post("http://ollama:11434/api/generate", json={
-            "model": "llama3",
-            "prompt": f"Expand this prompt to generate a detailed image description (max 60 words): {request.prompt}",
-            "stream": False
-        }, timeout=180)
-
-        llama_response.raise_for_status()
-        expanded_prompt = llama_response.json().get("response", "").strip()
-        
-        # Ensure prompt doesn't exceed 60 words
-        words = expanded_prompt.split()
-        if len(words) > 60:
-            expanded_prompt = " ".join(words[:60])
-            
-        logging.info(f"Expanded prompt ({len(expanded_prompt.split())} words): {expanded_prompt}")
-
-    except Exception as e:
-        logging.error(f"Error calling LLaMA: {e}")
-        # Use original prompt as fallback
-        expanded_prompt = request.prompt
+    # MEMORY: Extract keywords and expand the prompt, in one LLM call if enabled
+    llm_cache_hits = {'keywords': False, 'expansion': False}
+    combined = None
+    if COMBINED_LLM_CALL:
+        with timer.stage('combined_llm'):
+            combined = extract_keywords_and_expand(model, llm_cache_hits)
+    if combined:
+        extracted_keywords, expanded_prompt = combined
+    else:
+        logging.info("Extracting keywords for memory system...")
+        with timer.stage('keywords_llm'):
+            extracted_keywords = extract_keywords(model, llm_cache_hits)
+        with timer.stage('expansion_llm'):
+            expanded_prompt = expand_prompt(model, llm_cache_hits)
+
+    # Stop here if the caller abandoned the run while the LLM was answering
+    if is_cancelled(model):
+        finish_cancelled(model, timer)
+        return
 
     # Abort if prompt expansion failed
     if not expanded_prompt:
         response: OutputClass = model.response
         response.message = "Prompt expansion failed."
+        timer.finish('failed')
         return
 
+    creation_folder_path = None
+    cancel_token = cancel_token_of(model)
     try:
-        # Check connectivity to each app
-        for app_id in app_ids:
-            if app_id in stub._connections:
-                logging.info(f"Connected to app: {app_id}")
-            else:
-                logging.warning(f"Not connected to app: {app_id}")
-
         # Step 1: Call the Text-to-Image app
         logging.info("Step 1: Generating image from text...")
-        image_result = stub.call(
-            text_to_image_id,
-            {"prompt": expanded_prompt},
-            "super-user"
-        )
+        report_progress(model, 'text_to_image')
+        # Only the part of the initialization the LLM calls did not overlap is waited for
+        with timer.stage('stub_connect'):
+            stub.connect(text_to_image_id)
+        with timer.stage('text_to_image'):
+            image_result = stub.call(
+                text_to_image_id,
+                {"prompt": expanded_prompt},
+                "super-user",
+                on_progress=remote_progress(model, 'text_to_image'),
+                cancel_token=cancel_token
+            )
+
+        # stub.call returns None when the remote execution failed
+        if image_result is None:
+            raise Exception("text-to-image returned no result")
 
         # Get the raw image data (bytes)
         image_data = image_result.get("result")
         if not image_data:
             raise Exception("No image data returned from Text-to-Image app.")
 
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
         logging.info(f"Image data received: {type(image_data)}, size: {len(image_data)} bytes")
+        logging.info(f"Stub init timings: {stub.init_timings()}")
 
         # MEMORY: Create improved folder structure with SHORT names
         timestamp = datetime.now().strftime("%H%M%S")
@@ -250,86 +493,64 @@ Keywords:""",
         # Save the image locally as output.png AND in organized memory folder
         
         image_filename = f"{creation_folder_path}/image.png"
-        with open(image_filename, "wb") as f:
-            f.write(image_data)
+        image_size = len(image_data)
+        with timer.stage('artifact_writes'):
+            image_artifact = write_bytes(image_filename, image_data)
         logging.info(f"Image generated and saved as {image_filename}")
 
         # Step 2: Convert image to 3D model - USING YOUR WORKING APPROACH
         logging.info("Step 2: Converting image to 3D model...")
+        report_progress(model, 'image_to_3d')
         model_saved = False
         model_filename = f"{creation_folder_path}/model.glb"
         successful_api = None
 
-        # Process image using YOUR WORKING METHOD
-        try:
-            # Validate the image
-            image = Image.open(io.BytesIO(image_data))
-            logging.info(f"Image validation successful: {image.format}, size: {image.size}, mode: {image.mode}")
-            
-            # Convert to RGB if necessary
-            if image.mode in ('RGBA', 'LA'):
-                logging.info(f"Converting image from {image.mode} to RGB")
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'RGBA':
-                    background.paste(image, mask=image.split()[-1])
-                else:
-                    background.paste(image)
-                image = background
-            elif image.mode != 'RGB':
-                logging.info(f"Converting image from {image.mode} to RGB")
-                image = image.convert('RGB')
-            
-            # Resize if too large
-            max_size = 1024
-            if max(image.size) > max_size:
-                logging.info(f"Resizing image from {image.size} to fit {max_size}px")
-                image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-            
-            # Save as PNG (YOUR WORKING FORMAT)
-            png_buffer = io.BytesIO()
-            image.save(png_buffer, format='PNG')
-            png_data = png_buffer.getvalue()
-            logging.info(f"Processed image: PNG, {len(png_data)} bytes, size: {image.size}")
-
+        # Only images that are not already RGB PNGs within 1024px are decoded and re-encoded
+        with timer.stage('image_preprocessing'):
+            prepared_image = image_preprocessor.prepare(image_data)
             # Convert to base64 WITHOUT data URI prefix (YOUR WORKING METHOD)
-            image_base64 = base64.b64encode(png_data).decode('utf-8')
-
-        except Exception as img_error:
-            logging.error(f"Error processing image: {img_error}")
-            # Fallback to original data
-            image_base64 = base64.b64encode(image_data).decode('utf-8')
-
-        # Try each 3D API with YOUR WORKING METHOD
-        for api_info in image_to_3d_apis:
-            api_id = api_info["id"]
-            api_name = api_info["name"]
-            
-            # Check if this API is connected
-            if api_id not in stub._connections:
-                logging.warning(f"Skipping {api_name} - not connected")
-                continue
-                
-            logging.info(f"Trying {api_name}...")
-            
-            try:
-                # Use YOUR WORKING METHOD: Pure base64 without data URI
-                logging.info(f"Calling {api_name} with PNG base64...")
-                three_d_result = stub.call(
-                    api_id,
-                    {"input_image": image_base64},
-                    "super-user"
-                )
-                
-                if three_d_result:
-                    logging.info(f"Success with {api_name}!")
-                    successful_api = api_name
-                    break
-                else:
-                    logging.warning(f"{api_name} returned no result")
-                    
-            except Exception as api_error:
-                logging.warning(f"{api_name} failed: {str(api_error)}")
+            image_base64 = base64.b64encode(prepared_image.data).decode('utf-8')
+        preprocessing_path = prepared_image.path
+        # Only the base64 copy is needed from here on; let the raw and re-encoded images go
+        del image_result, image_data, prepared_image
+
+        # Try the 3D APIs best-scored first (success rate and latency), hedging to the next one if configured
+        ranked_ids = stub.rank([api_info["id"] for api_info in image_to_3d_apis])
+        available_apis = []
+        for api_info in sorted(image_to_3d_apis, key=lambda api_info: ranked_ids.index(api_info["id"])):
+            # Skip APIs whose circuit is open without spending a round trip on them
+            if not stub.is_available(api_info["id"]):
+                logging.warning(f"Skipping {api_info['name']} - circuit open")
                 continue
+            # Check if this API is connected (apps still connecting are skipped this time)
+            if stub.connect(api_info["id"], timeout=0):
+                available_apis.append(api_info)
+            else:
+                logging.warning(f"Skipping {api_info['name']} - not connected")
+
+        api_names = {api_info["id"]: api_info["name"] for api_info in available_apis}
+        logging.info(f"Calling 3D APIs {list(api_names.values())} with PNG base64 (hedge delay: {IMAGE_TO_3D_HEDGE_DELAY})...")
+
+        # Use YOUR WORKING METHOD: Pure base64 without data URI
+        image_to_3d_attempts = []
+        with timer.stage('image_to_3d'):
+            successful_id, three_d_result = stub.call_first(
+                list(api_names),
+                {"input_image": image_base64},
+                "super-user",
+                hedge_delay=IMAGE_TO_3D_HEDGE_DELAY,
+                accept=lambda result: bool(result.get("generated_object")),
+                attempts=image_to_3d_attempts,
+                on_progress=remote_progress(model, 'image_to_3d'),
+                cancel_token=cancel_token
+            )
+        logging.info(f"3D attempts: {image_to_3d_attempts}")
+        del image_base64
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        if three_d_result:
+            successful_api = api_names[successful_id]
+            logging.info(f"Success with {successful_api}!")
 
         # Process the 3D result if we got one
         if three_d_result:
@@ -339,20 +560,11 @@ Keywords:""",
             model_data = three_d_result.get("generated_object")
             
             if model_data:
-                try:
-                    if isinstance(model_data, str):
-                        model_bytes = base64.b64decode(model_data)
-                    else:
-                        model_bytes = model_data
-                except Exception as decode_error:
-                    logging.warning(f"Could not decode model data as base64: {decode_error}")
-                    model_bytes = model_data.encode() if isinstance(model_data, str) else model_data
-                
-                # Save the 3D model in both locations
-                
-                with open(model_filename, "wb") as f:
-                    f.write(model_bytes)
-                logging.info(f"3D model saved as {model_filename} ({len(model_bytes)} bytes)")
+                # Decode the base64 model straight to disk, chunk by chunk
+                with timer.stage('artifact_writes'):
+                    model_artifact = write_model(model_filename, model_data)
+                model_data = three_d_result = None
+                logging.info(f"3D model saved as {model_filename} ({model_artifact.size} bytes)")
                 logging.info(f"3D conversion successful using: {successful_api}")
                 model_saved = True
             else:
@@ -362,24 +574,36 @@ Keywords:""",
             logging.warning("All 3D APIs failed")
             model_filename = "none"
 
-        # MEMORY: Store everything in memory system
+        # MEMORY: Store everything in memory system (a run abandoned until now leaves nothing behind)
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
         logging.info("Storing memory...")
         
-        memory_id = memory_system.store_memory(
-            original_prompt=request.prompt,
-            expanded_prompt=expanded_prompt,
-            image_path=image_filename,
-            model_path=model_filename,
-            keywords=extracted_keywords,
-            metadata={
-                'image_size': len(image_data),
-                'model_generated': model_saved,
-                'timestamp': timestamp,
-                'keywords_source': 'llama' if extracted_keywords else 'fallback',
-                'creation_folder': creation_folder_path,
-                'successful_3d_api': successful_api if model_saved else None
-            }
-        )
+        with timer.stage('memory_store'):
+            memory_id = memory_system.store_memory(
+                original_prompt=request.prompt,
+                expanded_prompt=expanded_prompt,
+                image_path=image_filename,
+                model_path=model_filename,
+                keywords=extracted_keywords,
+                metadata={
+                    'image_size': image_size,
+                    'image_sha256': image_artifact.sha256,
+                    'model_size': model_artifact.size if model_saved else None,
+                    'model_sha256': model_artifact.sha256 if model_saved else None,
+                    'model_generated': model_saved,
+                    'timestamp': timestamp,
+                    'keywords_source': 'llama' if extracted_keywords else 'fallback',
+                    'creation_folder': creation_folder_path,
+                    'successful_3d_api': successful_api if model_saved else None,
+                    'llm_cache_hits': llm_cache_hits,
+                    'llm_combined_call': combined is not None,
+                    'image_preprocessing': preprocessing_path,
+                    # Stages up to (not including) the memory store itself
+                    'stage_durations': dict(timer.durations),
+                    'image_to_3d_attempts': image_to_3d_attempts
+                }
+            )
         
         # Save detailed information file
         details_file_path = f"{creation_folder_path}/details.txt"
@@ -404,13 +628,13 @@ FILES:
 - 3D Model: {'model.glb' if model_saved else 'FAILED'}
 
 METADATA:
-- Image Size: {len(image_data)} bytes
+- Image Size: {image_size} bytes
 - Model Generated: {model_saved}
 - Keywords Source: {'LLaMA' if extracted_keywords else 'Fallback'}
 - Successful 3D API: {successful_api if model_saved else 'None'}
 """
         
-        with open(details_file_path, 'w', encoding='utf-8') as f:
+        with timer.stage('artifact_writes'), open(details_file_path, 'w', encoding='utf-8') as f:
             f.write(details_content)
         
         logging.info(f"Details file saved: {details_file_path}")
@@ -449,9 +673,20 @@ Keywords: {', '.join(extracted_keywords)}
 
 Memory Stats: {stats['total_memories']} total memories stored"""
         
+        report_outcome(model,
+                       memory_id=memory_id,
+                       expanded_prompt=expanded_prompt,
+                       image_path=image_filename,
+                       model_path=model_filename if model_saved else None)
+        timer.finish('success' if model_saved else 'image_only')
+        logging.info(f"Stage durations: {timer.durations}")
         logging.info("Pipeline completed successfully!")
 
+    except OperationCancelledError:
+        finish_cancelled(model, timer, creation_folder_path)
+
     except Exception as e:
         logging.error(f"Error in pipeline: {str(e)}", exc_info=True)
         response: OutputClass = model.response
         response.message = f"Pipeline failed: {str(e)}"
+        timer.finish('failed')
@@ -1,11 +1,50 @@
 import json
 import sqlite3
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Tuple, Union
 from dataclasses import dataclass, asdict
 import hashlib
 import os
+import re
+
+from ann_index import IVFIndex
+from embeddings import EmbeddingMatrix, embedder, from_blob, to_blob
+from llm_cache import llm_cache
+from near_duplicates import LSH_MIN_RECALL, LSHIndex, MinHasher, minhasher, prompt_tokens
+from ollama_client import ollama
+
+# LLM prompt used to tag memories stored without keywords ({prompt} is replaced by the user prompt)
+TAGS_PROMPT_TEMPLATE = """Extract 5-8 relevant keywords from this prompt for categorization and search purposes. 
+Return only the keywords separated by commas, no explanations.
+
+Prompt: "{prompt}"
+
+Keywords:"""
+
+# SQLite tuning applied to every connection: durability of WAL commits (NORMAL only syncs at
+# checkpoints), page cache per connection in KiB, and bytes of the database file read through mmap
+MEMORY_DB_SYNCHRONOUS = os.environ.get('MEMORY_DB_SYNCHRONOUS', 'NORMAL')
+MEMORY_DB_CACHE_KB = int(os.environ.get('MEMORY_DB_CACHE_KB', 16384))
+MEMORY_DB_MMAP_SIZE = int(os.environ.get('MEMORY_DB_MMAP_SIZE', 256 * 1024 * 1024))
+# Milliseconds a writer waits for the lock held by another connection before failing
+MEMORY_DB_BUSY_TIMEOUT_MS = int(os.environ.get('MEMORY_DB_BUSY_TIMEOUT_MS', 5000))
+
+# BM25 weight of the original and expanded prompt columns (the user's own words count more)
+SEARCH_WEIGHTS = (2.0, 1.0)
+
+# Minimum cosine similarity between prompt embeddings for find_similar
+SIMILARITY_THRESHOLD = float(os.environ.get('MEMORY_SIMILARITY_THRESHOLD', 0.5))
+
+# Embeddings from which similarity search uses the approximate (IVF) index instead of an exact scan,
+# and index changes after which the ANN index is compacted and saved again
+ANN_MIN_ENTRIES = int(os.environ.get('MEMORY_ANN_MIN_ENTRIES', 50000))
+ANN_SAVE_EVERY = int(os.environ.get('MEMORY_ANN_SAVE_EVERY', 1000))
+
+# Words of a search query; everything else (quotes, operators) is dropped before building the FTS5 query
+_QUERY_TOKEN = re.compile(r'\w+\*?')
 
 @dataclass
 class MemoryEntry:
@@ -19,6 +58,13 @@ class MemoryEntry:
     tags: List[str]
     metadata: Dict[str, Any]
 
+@dataclass
+class SearchHit:
+    """A memory matching a search, with its relevance and highlighted excerpt"""
+    memory: MemoryEntry
+    score: float
+    snippet: str
+
 class MemorySystem:
     """
     AI Memory System - Remembers everything forever
@@ -26,21 +72,81 @@ class MemorySystem:
     Features:
     - Short-term: Session context during interaction
     - Long-term: SQLite persistence across sessions
-    - Smart search: Find similar prompts and creations
-    - Tagging: Organize memories by themes
+    - Smart search: Find similar prompts and creations (embedding cosine similarity over the whole history,
+      through a persistent approximate index once the history is large)
+    - Full-text search: FTS5 index of the prompts, BM25 ranking, prefix queries and snippets
+    - Near-duplicates: MinHash signature per memory and LSH buckets over the whole history
+    - Tagging: Organize memories by themes (one indexed row per tag, exact AND/OR queries)
+    - Thread-safe: one persistent connection per thread on a WAL database, so readers
+      (e.g. the Gradio browsing tab) never block on pipeline writes
     """
     
-    def __init__(self, db_path: str = "app/memory.db"):
+    def __init__(self, db_path: str = "app/memory.db", ann_path: str = os.environ.get('MEMORY_ANN_PATH')):
         self.db_path = db_path
+        self.ann_path = ann_path or f"{os.path.splitext(db_path)[0]}_ann"
         self.session_memory: Dict[str, Any] = {}
+        self._session_lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._connections_lock = threading.Lock()
+        # Loaded on the first similarity search, then kept up to date by store_memory
+        self._embeddings: Optional[Union[EmbeddingMatrix, IVFIndex]] = None
+        self._embeddings_loaded = False
+        self._embeddings_lock = threading.Lock()
+        self._ann_saving = False
+        self._ann_building = False
+        # Store-time embeddings are computed here, so that a slow Ollama never delays store_memory
+        self._embedding_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-embed")
+        # Built from the stored signatures on the first near-duplicate search
+        self._lsh: Optional[LSHIndex] = None
+        self._lsh_lock = threading.Lock()
         self.init_database()
         logging.info("Memory System initialized")
     
+    def _connection(self) -> sqlite3.Connection:
+        """Return the connection of the current thread, opening and tuning it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        # Only the owning thread uses it; check_same_thread is off so close() can run anywhere
+        conn = sqlite3.connect(self.db_path, timeout=MEMORY_DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute(f"PRAGMA synchronous = {MEMORY_DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size = -{MEMORY_DB_CACHE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {MEMORY_DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute(f"PRAGMA busy_timeout = {MEMORY_DB_BUSY_TIMEOUT_MS}")
+        self._local.conn = conn
+        
+        with self._connections_lock:
+            # Close the connections of threads that exited (worker pools replace their threads)
+            alive = []
+            for thread, other in self._connections:
+                if thread.is_alive():
+                    alive.append((thread, other))
+                else:
+                    other.close()
+            alive.append((threading.current_thread(), conn))
+            self._connections = alive
+        return conn
+    
+    def close(self):
+        """Close every open connection (threads reopen one on their next call)"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for _, conn in connections:
+            conn.close()
+        self._local = threading.local()
+    
     def init_database(self):
         """Initialize SQLite database for long-term memory"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
+            # WAL is stored in the file: readers then work on a snapshot while a write is in progress
+            journal_mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+            if journal_mode.lower() != 'wal':
+                logging.warning(f"Memory database journal mode is {journal_mode}, WAL not available")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS memories (
                     id TEXT PRIMARY KEY,
@@ -56,10 +162,158 @@ class MemorySystem:
             conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_timestamp ON memories(timestamp)
             """)
+            # Replaced by memory_tags: an index on the JSON list cannot answer tag queries
+            conn.execute("DROP INDEX IF EXISTS idx_tags")
+        self.init_tag_table()
+        self.init_embedding_table()
+        self.init_minhash_table()
+        self.fts_enabled = self.init_search_index()
+        logging.info("Long-term memory database ready")
+    
+    def init_tag_table(self):
+        """Create the tag table (one row per memory and tag), filling it from existing memories on first run"""
+        with self._connection() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memory_tags'"
+            ).fetchone() is not None
             conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_tags ON memories(tags)
+                CREATE TABLE IF NOT EXISTS memory_tags (
+                    memory_id TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    PRIMARY KEY (memory_id, tag)
+                ) WITHOUT ROWID
             """)
-        logging.info("Long-term memory database ready")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_memory_tags_tag ON memory_tags(tag, memory_id)
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS memory_tags_delete AFTER DELETE ON memories BEGIN
+                    DELETE FROM memory_tags WHERE memory_id = old.id;
+                END
+            """)
+            
+            if not exists:
+                # Migration: split the JSON tag lists of the memories stored so far
+                rows = []
+                for memory_id, tags in conn.execute("SELECT id, tags FROM memories"):
+                    try:
+                        rows.extend((memory_id, tag) for tag in self._normalize_tags(json.loads(tags)))
+                    except (ValueError, TypeError) as e:
+                        logging.warning(f"Skipping unreadable tags of memory {memory_id}: {e}")
+                conn.executemany("INSERT OR IGNORE INTO memory_tags (memory_id, tag) VALUES (?, ?)", rows)
+                logging.info(f"Tag table filled with {len(rows)} tags of existing memories")
+    
+    def init_embedding_table(self):
+        """Create the table of prompt embeddings (float32 blobs, tagged with the model that computed them)"""
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS memory_embeddings (
+                    memory_id TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS memory_embeddings_delete AFTER DELETE ON memories BEGIN
+                    DELETE FROM memory_embeddings WHERE memory_id = old.id;
+                END
+            """)
+    
+    def init_minhash_table(self):
+        """Create the table of MinHash signatures, computing the missing ones (no model needed, so done at startup)"""
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS memory_minhash (
+                    memory_id TEXT PRIMARY KEY,
+                    signature BLOB NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS memory_minhash_delete AFTER DELETE ON memories BEGIN
+                    DELETE FROM memory_minhash WHERE memory_id = old.id;
+                END
+            """)
+            
+            # Memories stored before signatures existed, or with another number of permutations
+            rows = conn.execute("""
+                SELECT m.id, m.original_prompt FROM memories m
+                LEFT JOIN memory_minhash h ON h.memory_id = m.id
+                WHERE h.memory_id IS NULL OR length(h.signature) != ?
+            """, (minhasher.num_perm * 4,)).fetchall()
+            if rows:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO memory_minhash (memory_id, signature) VALUES (?, ?)",
+                    [(memory_id, MinHasher.to_blob(minhasher.signature(prompt_tokens(prompt)))) for memory_id, prompt in rows]
+                )
+                logging.info(f"MinHash signatures computed for {len(rows)} existing memories")
+    
+    @staticmethod
+    def _normalize_tags(tags: List[str]) -> List[str]:
+        """Lowercase and strip tags, dropping empty ones and duplicates (order kept)"""
+        normalized = []
+        for tag in tags or []:
+            tag = str(tag).strip().lower()
+            if tag and tag not in normalized:
+                normalized.append(tag)
+        return normalized
+    
+    def init_search_index(self) -> bool:
+        """
+        Create the FTS5 index of the prompts, indexing existing memories on first run
+        
+        The index is an external-content table over `memories` kept in sync by triggers,
+        so the prompts are not stored twice.
+        
+        Returns:
+            False if this SQLite build has no FTS5 (search then falls back to LIKE)
+        """
+        with self._connection() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memories_fts'"
+            ).fetchone() is not None
+            try:
+                conn.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+                        original_prompt,
+                        expanded_prompt,
+                        content = 'memories',
+                        content_rowid = 'rowid',
+                        tokenize = 'unicode61 remove_diacritics 2',
+                        prefix = '2 3'
+                    )
+                """)
+            except sqlite3.OperationalError as e:
+                logging.warning(f"FTS5 not available, memory search uses LIKE: {e}")
+                return False
+            
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS memories_fts_insert AFTER INSERT ON memories BEGIN
+                    INSERT INTO memories_fts(rowid, original_prompt, expanded_prompt)
+                    VALUES (new.rowid, new.original_prompt, new.expanded_prompt);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS memories_fts_delete AFTER DELETE ON memories BEGIN
+                    INSERT INTO memories_fts(memories_fts, rowid, original_prompt, expanded_prompt)
+                    VALUES ('delete', old.rowid, old.original_prompt, old.expanded_prompt);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS memories_fts_update AFTER UPDATE ON memories BEGIN
+                    INSERT INTO memories_fts(memories_fts, rowid, original_prompt, expanded_prompt)
+                    VALUES ('delete', old.rowid, old.original_prompt, old.expanded_prompt);
+                    INSERT INTO memories_fts(rowid, original_prompt, expanded_prompt)
+                    VALUES (new.rowid, new.original_prompt, new.expanded_prompt);
+                END
+            """)
+            
+            if not exists:
+                # Migration: index the memories stored before the index existed
+                conn.execute("INSERT INTO memories_fts(memories_fts) VALUES ('rebuild')")
+                count = conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+                logging.info(f"Full-text index built for {count} existing memories")
+        return True
     
     def generate_memory_id(self, prompt: str) -> str:
         """Generate unique ID for memory entry"""
@@ -107,12 +361,23 @@ class MemorySystem:
             metadata=metadata
         )
         
-        # Store in long-term memory (SQLite)
-        with sqlite3.connect(self.db_path) as conn:
+        signature = minhasher.signature(prompt_tokens(original_prompt))
+        
+        # Store in long-term memory (SQLite); an upsert keeps the rowid, so the
+        # full-text index is updated by its trigger instead of leaving a stale entry
+        with self._connection() as conn:
             conn.execute("""
-                INSERT OR REPLACE INTO memories 
+                INSERT INTO memories 
                 (id, timestamp, original_prompt, expanded_prompt, image_path, model_path, tags, metadata)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    timestamp = excluded.timestamp,
+                    original_prompt = excluded.original_prompt,
+                    expanded_prompt = excluded.expanded_prompt,
+                    image_path = excluded.image_path,
+                    model_path = excluded.model_path,
+                    tags = excluded.tags,
+                    metadata = excluded.metadata
             """, (
                 memory.id,
                 memory.timestamp,
@@ -123,9 +388,20 @@ class MemorySystem:
                 json.dumps(memory.tags),
                 json.dumps(memory.metadata)
             ))
+            conn.execute("DELETE FROM memory_tags WHERE memory_id = ?", (memory.id,))
+            conn.executemany("INSERT INTO memory_tags (memory_id, tag) VALUES (?, ?)",
+                             [(memory.id, tag) for tag in self._normalize_tags(memory.tags)])
+            conn.execute("INSERT OR REPLACE INTO memory_minhash (memory_id, signature) VALUES (?, ?)",
+                         (memory.id, MinHasher.to_blob(signature)))
+        
+        with self._lsh_lock:
+            if self._lsh is not None:
+                self._lsh.add(memory.id, signature)
+        self._embedding_executor.submit(self._embed_memory, memory.id, original_prompt)
         
         # Store in short-term memory (session)
-        self.session_memory[memory_id] = asdict(memory)
+        with self._session_lock:
+            self.session_memory[memory_id] = asdict(memory)
         
         logging.info(f"Memory stored: {memory_id} - '{original_prompt[:50]}...'")
         return memory_id
@@ -133,77 +409,172 @@ class MemorySystem:
     def recall_memory(self, memory_id: str) -> Optional[MemoryEntry]:
         """Recall a specific memory by ID"""
         # Try session memory first (faster)
-        if memory_id in self.session_memory:
-            data = self.session_memory[memory_id]
+        with self._session_lock:
+            data = self.session_memory.get(memory_id)
+        if data is not None:
             return MemoryEntry(**data)
         
         # Try long-term memory
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.execute("""
                 SELECT * FROM memories WHERE id = ?
             """, (memory_id,))
             row = cursor.fetchone()
             
             if row:
-                return MemoryEntry(
-                    id=row[0],
-                    timestamp=row[1],
-                    original_prompt=row[2],
-                    expanded_prompt=row[3],
-                    image_path=row[4],
-                    model_path=row[5],
-                    tags=json.loads(row[6]),
-                    metadata=json.loads(row[7])
-                )
+                return self._row_to_memory(row)
         return None
     
+    @staticmethod
+    def _row_to_memory(row: Tuple) -> MemoryEntry:
+        """Build a memory from a `memories` row (columns in table order)"""
+        return MemoryEntry(
+            id=row[0],
+            timestamp=row[1],
+            original_prompt=row[2],
+            expanded_prompt=row[3],
+            image_path=row[4],
+            model_path=row[5],
+            tags=json.loads(row[6]),
+            metadata=json.loads(row[7])
+        )
+    
     def search_memories(self, 
                        query: str = None,
                        tags: List[str] = None,
-                       limit: int = 10) -> List[MemoryEntry]:
+                       limit: int = 10,
+                       prefix: bool = False,
+                       match_all_tags: bool = True) -> List[MemoryEntry]:
         """
         Search memories by query or tags
         
         Args:
-            query: Text to search in prompts
-            tags: Tags to filter by
+            query: Text to search in prompts (every word must match; `word*` matches a prefix)
+            tags: Tags to filter by (exact, case-insensitive)
             limit: Maximum results to return
+            prefix: Also match the last query word as a prefix (search-as-you-type)
+            match_all_tags: Require every tag (AND) instead of any of them (OR)
             
         Returns:
-            List of matching memories
+            List of matching memories, most relevant first (most recent first without a query)
+        """
+        return [hit.memory for hit in self.search(query, tags, limit, prefix, match_all_tags, snippets=False)]
+    
+    def search(self,
+               query: str = None,
+               tags: List[str] = None,
+               limit: int = 10,
+               prefix: bool = False,
+               match_all_tags: bool = True,
+               snippets: bool = True,
+               highlight: Tuple[str, str] = ('[', ']')) -> List[SearchHit]:
         """
-        with sqlite3.connect(self.db_path) as conn:
-            sql = "SELECT * FROM memories WHERE 1=1"
-            params = []
+        Full-text search returning the relevance and a highlighted excerpt of each match
+        
+        Args:
+            query: Text to search in prompts (every word must match; `word*` matches a prefix)
+            tags: Tags to filter by (exact, case-insensitive)
+            limit: Maximum results to return
+            prefix: Also match the last query word as a prefix (search-as-you-type)
+            match_all_tags: Require every tag (AND) instead of any of them (OR)
+            snippets: Build the highlighted excerpts
+            highlight: Markers placed around the matched words in the excerpts
             
-            if query:
-                sql += " AND (original_prompt LIKE ? OR expanded_prompt LIKE ?)"
-                params.extend([f"%{query}%", f"%{query}%"])
+        Returns:
+            Matches, most relevant first (BM25; higher score is better)
+        """
+        match = self._match_expression(query, prefix) if query else None
+        if query and (match is None or not self.fts_enabled):
+            return self._search_like(query, tags, limit, match_all_tags)
+        
+        with self._connection() as conn:
+            params: List[Any] = []
+            if match:
+                excerpt = "snippet(memories_fts, -1, ?, ?, '...', 16)" if snippets else "''"
+                sql = f"""
+                    SELECT m.*, -bm25(memories_fts, ?, ?) AS score, {excerpt}
+                    FROM memories_fts JOIN memories m ON m.rowid = memories_fts.rowid
+                    WHERE memories_fts MATCH ?
+                """
+                params.extend(SEARCH_WEIGHTS)
+                if snippets:
+                    params.extend(highlight)
+                params.append(match)
+            else:
+                sql = "SELECT m.*, 0.0, '' FROM memories m WHERE 1=1"
             
-            if tags:
-                for tag in tags:
-                    sql += " AND tags LIKE ?"
-                    params.append(f"%{tag}%")
+            tag_sql, tag_params = self._tag_filter(tags, match_all_tags, column="m.id")
+            sql += tag_sql
+            params.extend(tag_params)
             
-            sql += " ORDER BY timestamp DESC LIMIT ?"
+            sql += " ORDER BY score DESC LIMIT ?" if match else " ORDER BY m.timestamp DESC LIMIT ?"
             params.append(limit)
             
-            cursor = conn.execute(sql, params)
-            results = []
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                logging.warning(f"Full-text search failed for '{query}', using LIKE: {e}")
+                return self._search_like(query, tags, limit, match_all_tags)
+        
+        return [SearchHit(self._row_to_memory(row), row[8], row[9]) for row in rows]
+    
+    @staticmethod
+    def _match_expression(query: str, prefix: bool = False) -> Optional[str]:
+        """
+        Turn free text into an FTS5 query: each word is quoted (so operators and
+        punctuation typed by users cannot break the syntax) and the words are AND-ed
+        
+        Returns:
+            The MATCH expression, or None if the query has no word
+        """
+        tokens = _QUERY_TOKEN.findall(query)
+        if not tokens:
+            return None
+        
+        terms = []
+        for index, token in enumerate(tokens):
+            word = token.rstrip('*')
+            if token.endswith('*') or (prefix and index == len(tokens) - 1):
+                terms.append(f'"{word}"*')
+            else:
+                terms.append(f'"{word}"')
+        return ' '.join(terms)
+    
+    def _tag_filter(self, tags: Optional[List[str]], match_all: bool = True,
+                    column: str = "id") -> Tuple[str, List[Any]]:
+        """
+        SQL condition restricting memories to tags, answered from the memory_tags index
+        
+        Returns:
+            (" AND <column> IN (...)" or "", parameters)
+        """
+        tags = self._normalize_tags(tags)
+        if not tags:
+            return "", []
+        
+        placeholders = ', '.join('?' * len(tags))
+        sql = f" AND {column} IN (SELECT memory_id FROM memory_tags WHERE tag IN ({placeholders})"
+        if match_all and len(tags) > 1:
+            sql += " GROUP BY memory_id HAVING COUNT(*) = ?"
+            return sql + ")", tags + [len(tags)]
+        return sql + ")", tags
+    
+    def _search_like(self, query: str, tags: List[str] = None, limit: int = 10,
+                     match_all_tags: bool = True) -> List[SearchHit]:
+        """Substring search with LIKE (full scan), used when FTS5 cannot answer the query"""
+        with self._connection() as conn:
+            sql = "SELECT * FROM memories WHERE (original_prompt LIKE ? OR expanded_prompt LIKE ?)"
+            params: List[Any] = [f"%{query}%", f"%{query}%"]
             
-            for row in cursor.fetchall():
-                results.append(MemoryEntry(
-                    id=row[0],
-                    timestamp=row[1],
-                    original_prompt=row[2],
-                    expanded_prompt=row[3],
-                    image_path=row[4],
-                    model_path=row[5],
-                    tags=json.loads(row[6]),
-                    metadata=json.loads(row[7])
-                ))
+            tag_sql, tag_params = self._tag_filter(tags, match_all_tags)
+            sql += tag_sql
+            params.extend(tag_params)
             
-            return results
+            sql += " ORDER BY timestamp DESC LIMIT ?"
+            params.append(limit)
+            rows = conn.execute(sql, params).fetchall()
+        
+        return [SearchHit(self._row_to_memory(row), 0.0, row[2]) for row in rows]
     
     def get_recent_memories(self, limit: int = 5) -> List[MemoryEntry]:
         """Get most recent memories"""
@@ -212,21 +583,21 @@ class MemorySystem:
     def extract_keywords_with_llama(self, prompt: str) -> List[str]:
         """Extract keywords using LLaMA for better semantic understanding"""
         try:
-            import requests
-            
-            llama_response = requests.post("http://ollama:11434/api/generate", json={
-                "model": "llama3",
-                "prompt": f"""Extract 5-8 relevant keywords from this prompt for categorization and search purposes. 
-Return only the keywords separated by commas, no explanations.
-
-Prompt: "{prompt}"
-
-Keywords:""",
-                "stream": False
-            }, timeout=60)
+            # Generation limits, hashed into the cache key so that changing them regenerates the tags
+            options = {'max_words': 40, 'stop': ["\n\n"], 'num_predict': 64}
+            cache_key = llm_cache.make_key("llama3", TAGS_PROMPT_TEMPLATE, prompt, options)
+            keywords_text = llm_cache.get(cache_key)
             
-            llama_response.raise_for_status()
-            keywords_text = llama_response.json().get("response", "").strip()
+            if keywords_text is None:
+                keywords_text = ollama.generate(
+                    "llama3",
+                    TAGS_PROMPT_TEMPLATE.format(prompt=prompt),
+                    timeout=60,
+                    **options
+                )
+                llm_cache.put(cache_key, keywords_text)
+            else:
+                logging.info("LLaMA keywords served from cache")
             
             # Parse keywords from response
             keywords = [kw.strip().lower() for kw in keywords_text.split(',') if kw.strip()]
@@ -273,25 +644,30 @@ Keywords:""",
     
     def get_memory_stats(self) -> Dict[str, Any]:
         """Get memory system statistics"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.execute("SELECT COUNT(*) FROM memories")
             total_memories = cursor.fetchone()[0]
             
-            cursor = conn.execute("""
-                SELECT tags, COUNT(*) as count 
-                FROM memories 
-                GROUP BY tags 
-                ORDER BY count DESC 
-                LIMIT 10
-            """)
-            popular_tags = cursor.fetchall()
+            cursor = conn.execute("SELECT COUNT(DISTINCT tag) FROM memory_tags")
+            distinct_tags = cursor.fetchone()[0]
         
         return {
             'total_memories': total_memories,
             'session_memories': len(self.session_memory),
-            'popular_tags': popular_tags
+            'distinct_tags': distinct_tags,
+            'popular_tags': self.get_tag_counts(limit=10)
         }
     
+    def get_tag_counts(self, limit: int = None) -> List[Tuple[str, int]]:
+        """Number of memories per tag, most used first"""
+        sql = "SELECT tag, COUNT(*) AS count FROM memory_tags GROUP BY tag ORDER BY count DESC, tag"
+        params: List[Any] = []
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connection() as conn:
+            return [(tag, count) for tag, count in conn.execute(sql, params)]
+    
     def save_prompt_to_folder(self, original_prompt: str, expanded_prompt: str, memory_id: str, folder_path: str = None) -> str:
         """Save prompts to organized folder structure by date"""
         # Use provided folder_path or create date-based folder structure
@@ -324,24 +700,364 @@ EXPANDED PROMPT:
         logging.info(f"Prompt saved to: {file_path}")
         return file_path
     
-    def find_similar(self, prompt: str, limit: int = 3) -> List[MemoryEntry]:
-        """Find memories similar to given prompt"""
-        # Simple similarity based on common words
-        prompt_words = set(prompt.lower().split())
-        memories = self.get_recent_memories(limit=50)  # Get more to compare
-        
-        scored_memories = []
-        for memory in memories:
-            memory_words = set(memory.original_prompt.lower().split())
-            common_words = prompt_words.intersection(memory_words)
-            score = len(common_words) / max(len(prompt_words), 1)
+    def find_similar(self, prompt: str, limit: int = 3,
+                     min_score: float = SIMILARITY_THRESHOLD) -> List[MemoryEntry]:
+        """
+        Find memories similar to given prompt
+        
+        Compares the prompt embedding with every stored memory (cosine similarity);
+        falls back to word overlap with the LSH candidates when embeddings are unavailable.
+        """
+        vector = embedder.embed(prompt)
+        index = self._embedding_index() if vector is not None else None
+        if index is None or index.dim != len(vector):
+            return self._find_similar_lexical(prompt, limit)
+        
+        similar = []
+        for memory_id, score in index.search(vector, limit, min_score):
+            memory = self.recall_memory(memory_id)
+            if memory:
+                similar.append(memory)
+        return similar
+    
+    def _find_similar_lexical(self, prompt: str, limit: int = 3) -> List[MemoryEntry]:
+        """Find memories sharing most of their words with the prompt (its LSH candidates, by Jaccard similarity)"""
+        prompt_words = prompt_tokens(prompt)
+        if not prompt_words:
+            return []
+        similar = []
+        for score, memory_id in self._word_similarities(prompt_words, 0.1)[:limit]:
+            memory = self.recall_memory(memory_id)
+            if memory:
+                similar.append(memory)
+        return similar
+    
+    def _embed_memory(self, memory_id: str, prompt: str) -> None:
+        """
+        Embed the prompt of a stored memory in the background (best effort: a memory left
+        without an embedding is picked up by backfill_embeddings)
+        """
+        vector = embedder.embed(prompt)
+        if vector is None:
+            return
+        with self._connection() as conn:
+            # The memory may have been deleted while its prompt was embedded
+            stored = conn.execute("""
+                INSERT OR REPLACE INTO memory_embeddings (memory_id, model, dim, vector)
+                SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM memories WHERE id = ?)
+            """, (memory_id, embedder.model, len(vector), to_blob(vector), memory_id)).rowcount > 0
+        if stored:
+            self._index_embedding(memory_id, vector)
+    
+    def _store_embedding(self, conn: sqlite3.Connection, memory_id: str, vector) -> None:
+        """Save the embedding of a memory (inside the caller's transaction)"""
+        conn.execute("""
+            INSERT OR REPLACE INTO memory_embeddings (memory_id, model, dim, vector)
+            VALUES (?, ?, ?, ?)
+        """, (memory_id, embedder.model, len(vector), to_blob(vector)))
+    
+    def _index_embedding(self, memory_id: str, vector) -> None:
+        """Add an embedding to the in-memory index if it is loaded (it is read from the table otherwise)"""
+        with self._embeddings_lock:
+            if not self._embeddings_loaded:
+                return
+            if self._embeddings is None:
+                self._embeddings = EmbeddingMatrix(len(vector))
+            if self._embeddings.dim == len(vector):
+                self._embeddings.add(memory_id, vector)
+                self._save_ann_index_if_needed()
+                self._build_ann_index_if_needed()
+    
+    def _embedding_index(self) -> Optional[Union[EmbeddingMatrix, IVFIndex]]:
+        """Return the index of stored embeddings of the current model, loading it on first use"""
+        with self._embeddings_lock:
+            if not self._embeddings_loaded:
+                self._embeddings = self._load_embedding_index()
+                self._embeddings_loaded = True
+            return self._embeddings
+    
+    def _load_embedding_index(self) -> Optional[Union[EmbeddingMatrix, IVFIndex]]:
+        """
+        Load the embeddings: an exact matrix for small histories, the saved ANN index
+        (or a new one, built and saved) from ANN_MIN_ENTRIES embeddings
+        """
+        with self._connection() as conn:
+            count = conn.execute(
+                "SELECT COUNT(*) FROM memory_embeddings WHERE model = ?", (embedder.model,)
+            ).fetchone()[0]
+        if count >= ANN_MIN_ENTRIES:
+            index = self._load_ann_index()
+            if index is not None:
+                return index
+        
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT memory_id, vector FROM memory_embeddings WHERE model = ?", (embedder.model,)
+            ).fetchall()
+        matrix = EmbeddingMatrix.from_rows([row[0] for row in rows], [row[1] for row in rows])
+        del rows
+        logging.info(f"Loaded {len(matrix) if matrix else 0} memory embeddings ({embedder.model})")
+        if matrix is None or len(matrix) < ANN_MIN_ENTRIES:
+            return matrix
+        
+        logging.info(f"Building the ANN index of {len(matrix)} memory embeddings")
+        index = IVFIndex.build(matrix.ids(), matrix.vectors())
+        self._save_ann_index(index)
+        return index
+    
+    def _load_ann_index(self) -> Optional[IVFIndex]:
+        """Open the saved ANN index and catch up with embeddings stored or deleted since it was saved"""
+        index, meta = IVFIndex.load(self.ann_path)
+        if index is None or meta.get('model') != embedder.model:
+            return None
+        
+        with self._connection() as conn:
+            stored = {row[0] for row in conn.execute(
+                "SELECT memory_id FROM memory_embeddings WHERE model = ?", (embedder.model,))}
+        indexed = set(index.ids())
+        for memory_id in indexed - stored:
+            index.remove(memory_id)
+        missing = list(stored - indexed)
+        for start in range(0, len(missing), 500):
+            batch = missing[start:start + 500]
+            with self._connection() as conn:
+                rows = conn.execute(
+                    f"SELECT memory_id, vector FROM memory_embeddings WHERE memory_id IN ({', '.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+            for memory_id, blob in rows:
+                if len(blob) == index.dim * 4:
+                    index.add(memory_id, from_blob(blob))
+        
+        logging.info(f"Loaded ANN index of {len(index)} memory embeddings from {self.ann_path} "
+                     f"({len(missing)} added, {len(indexed - stored)} removed since it was saved)")
+        return index
+    
+    def _save_ann_index_if_needed(self) -> None:
+        """Save the ANN index once enough inserts and deletes accumulated (embeddings lock held)"""
+        if isinstance(self._embeddings, IVFIndex) and self._embeddings.pending_changes() >= ANN_SAVE_EVERY:
+            self._save_ann_index(self._embeddings)
+    
+    def _build_ann_index_if_needed(self) -> None:
+        """
+        Replace the exact matrix by an ANN index once it holds ANN_MIN_ENTRIES embeddings
+        (embeddings lock held); the index is built in the background from a copy
+        """
+        matrix = self._embeddings
+        if self._ann_building or not isinstance(matrix, EmbeddingMatrix) or len(matrix) < ANN_MIN_ENTRIES:
+            return
+        self._ann_building = True
+        ids, vectors = matrix.ids(), matrix.vectors().copy()
+        
+        def build():
+            try:
+                logging.info(f"Building the ANN index of {len(ids)} memory embeddings")
+                index = IVFIndex.build(ids, vectors)
+                with self._embeddings_lock:
+                    if self._embeddings is not matrix:
+                        return
+                    # Catch up with the embeddings stored and deleted during the build
+                    built, current = set(ids), matrix.ids()
+                    for memory_id in built - set(current):
+                        index.remove(memory_id)
+                    for memory_id in current:
+                        if memory_id not in built:
+                            index.add(memory_id, matrix.vector(memory_id))
+                    self._embeddings = index
+                    self._save_ann_index(index)
+            except Exception as e:
+                logging.error(f"Could not build the ANN index: {e}")
+            finally:
+                self._ann_building = False
+        
+        threading.Thread(target=build, name="ann-index-build", daemon=True).start()
+    
+    def _save_ann_index(self, index: IVFIndex) -> None:
+        """Compact and save the ANN index in the background (one save at a time)"""
+        if self._ann_saving:
+            return
+        self._ann_saving = True
+        
+        def save():
+            try:
+                index.save(self.ann_path, {'model': embedder.model})
+            except Exception as e:
+                logging.error(f"Could not save the ANN index to {self.ann_path}: {e}")
+            finally:
+                self._ann_saving = False
+        
+        threading.Thread(target=save, name="ann-index-save", daemon=True).start()
+    
+    def delete_memory(self, memory_id: str) -> bool:
+        """Delete a memory with its tags, search entry and embedding"""
+        with self._connection() as conn:
+            deleted = conn.execute("DELETE FROM memories WHERE id = ?", (memory_id,)).rowcount > 0
+        with self._session_lock:
+            self.session_memory.pop(memory_id, None)
+        with self._embeddings_lock:
+            if self._embeddings is not None:
+                self._embeddings.remove(memory_id)
+                self._save_ann_index_if_needed()
+        with self._lsh_lock:
+            if self._lsh is not None:
+                self._lsh.remove(memory_id)
+        if deleted:
+            logging.info(f"Memory deleted: {memory_id}")
+        return deleted
+    
+    def backfill_embeddings(self, batch_size: int = 32, limit: int = None) -> int:
+        """
+        Embed the memories stored without an embedding of the current model
+        
+        Args:
+            batch_size: Memories embedded per database transaction
+            limit: Maximum memories to embed (None: all of them)
+            
+        Returns:
+            Number of memories embedded
+        """
+        with self._connection() as conn:
+            rows = conn.execute("""
+                SELECT m.id, m.original_prompt FROM memories m
+                LEFT JOIN memory_embeddings e ON e.memory_id = m.id AND e.model = ?
+                WHERE e.memory_id IS NULL
+                ORDER BY m.timestamp DESC
+            """, (embedder.model,)).fetchall()
+        if limit is not None:
+            rows = rows[:limit]
+        
+        embedded = 0
+        for start in range(0, len(rows), batch_size):
+            batch = []
+            for memory_id, prompt in rows[start:start + batch_size]:
+                vector = embedder.embed(prompt)
+                if vector is not None:
+                    batch.append((memory_id, vector))
+            if not batch:
+                logging.warning("Embedding backfill stopped: no embedding could be computed")
+                break
+            
+            with self._connection() as conn:
+                for memory_id, vector in batch:
+                    self._store_embedding(conn, memory_id, vector)
+            for memory_id, vector in batch:
+                self._index_embedding(memory_id, vector)
+            embedded += len(batch)
+            logging.info(f"Embedding backfill: {embedded}/{len(rows)} memories")
+        return embedded
+
+    def find_reusable(self, prompt: str, threshold: float = 0.9, limit: int = 50) -> Optional[Tuple[MemoryEntry, float]]:
+        """
+        Find a previous creation that can be reused for this prompt
+        
+        Args:
+            prompt: User's original input
+            threshold: Minimum word-set (Jaccard) similarity for a near-exact match
+            limit: Maximum near-exact matches considered
             
-            if score > 0.1:  # Minimum similarity threshold
-                scored_memories.append((score, memory))
+        Returns:
+            (memory, similarity) of the best match whose files still exist, or None
+        """
+        normalized = ' '.join(prompt.lower().split())
         
-        # Sort by score and return top results
-        scored_memories.sort(key=lambda x: x[0], reverse=True)
-        return [memory for score, memory in scored_memories[:limit]]
+        # Exact match (case and surrounding whitespace ignored) anywhere in history
+        candidates = []
+        with self._connection() as conn:
+            cursor = conn.execute("""
+                SELECT id FROM memories WHERE lower(trim(original_prompt)) = ?
+                ORDER BY timestamp DESC
+            """, (normalized,))
+            for (memory_id,) in cursor.fetchall():
+                candidates.append((1.0, self.recall_memory(memory_id)))
+        
+        # Near-exact matches anywhere in history
+        for memory, score in self.find_near_duplicates(prompt, threshold, limit):
+            candidates.append((score, memory))
+        
+        candidates.sort(key=lambda x: x[0], reverse=True)
+        for score, memory in candidates:
+            if self._has_artifacts(memory):
+                return memory, score
+        return None
+    
+    def find_near_duplicates(self, prompt: str, threshold: float = 0.8,
+                             limit: int = 10) -> List[Tuple[MemoryEntry, float]]:
+        """
+        Find memories whose prompt has nearly the same words, across the whole history
+        
+        Candidates come from the LSH buckets of the prompt's MinHash signature and are
+        checked with the exact word-set (Jaccard) similarity. For thresholds too low for
+        the buckets to find nearly every match (see MEMORY_LSH_THRESHOLD), every stored
+        prompt is compared instead.
+        
+        Args:
+            prompt: Prompt to compare
+            threshold: Minimum Jaccard similarity of the word sets
+            limit: Maximum matches returned
+            
+        Returns:
+            (memory, similarity) pairs, most similar first
+        """
+        prompt_words = prompt_tokens(prompt)
+        if not prompt_words:
+            return []
+        scan_all = self._lsh_index().recall(threshold) < LSH_MIN_RECALL
+        if scan_all:
+            logging.info(f"Near-duplicate threshold {threshold} below what the LSH index finds reliably, scanning all prompts")
+        
+        matches = []
+        for score, memory_id in self._word_similarities(prompt_words, threshold, scan_all)[:limit]:
+            memory = self.recall_memory(memory_id)
+            if memory:
+                matches.append((memory, score))
+        return matches
+    
+    def _word_similarities(self, prompt_words: Set[str], threshold: float,
+                           scan_all: bool = False) -> List[Tuple[float, str]]:
+        """
+        (Jaccard similarity, memory ID) of the memories whose prompt words reach the
+        threshold, most similar first: only the LSH candidates, or every memory if scan_all
+        """
+        scored = []
+        with self._connection() as conn:
+            if scan_all:
+                rows = conn.execute("SELECT id, original_prompt FROM memories")
+            else:
+                candidate_ids = list(self._lsh_index().candidates(minhasher.signature(prompt_words)))
+                rows = []
+                for start in range(0, len(candidate_ids), 500):
+                    batch = candidate_ids[start:start + 500]
+                    rows.extend(conn.execute(
+                        f"SELECT id, original_prompt FROM memories WHERE id IN ({', '.join('?' * len(batch))})", batch
+                    ))
+            
+            for memory_id, original_prompt in rows:
+                memory_words = prompt_tokens(original_prompt)
+                score = len(prompt_words & memory_words) / len(prompt_words | memory_words)
+                if score >= threshold:
+                    scored.append((score, memory_id))
+        
+        scored.sort(reverse=True)
+        return scored
+    
+    def _lsh_index(self) -> LSHIndex:
+        """Return the LSH index of the stored signatures, building it on first use"""
+        with self._lsh_lock:
+            if self._lsh is None:
+                lsh = LSHIndex(minhasher.num_perm)
+                with self._connection() as conn:
+                    for memory_id, blob in conn.execute("SELECT memory_id, signature FROM memory_minhash"):
+                        if len(blob) == minhasher.num_perm * 4:
+                            lsh.add(memory_id, MinHasher.from_blob(blob))
+                self._lsh = lsh
+                logging.info(f"LSH index built for {len(lsh)} memories ({lsh.bands} bands of {lsh.rows} rows)")
+            return self._lsh
+    
+    def _has_artifacts(self, memory: MemoryEntry) -> bool:
+        """Check that the image and 3D model of a memory are still on disk"""
+        return (memory.model_path not in (None, '', 'none')
+                and os.path.exists(memory.image_path)
+                and os.path.exists(memory.model_path))
 
 # Global memory system instance
 memory_system = MemorySystem()
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import threading
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+# Hash functions per signature: more gives finer Jaccard estimates and larger signatures (4 bytes each)
+MINHASH_PERMUTATIONS = int(os.environ.get('MEMORY_MINHASH_PERM', 128))
+# Jaccard similarity around which the LSH bands are tuned: kept below the similarities searched
+# for, so that pairs at 0.8 share a bucket with probability 0.99998 (and at 0.7 with 0.99)
+LSH_THRESHOLD = float(os.environ.get('MEMORY_LSH_THRESHOLD', 0.6))
+# Cost of missing a near-duplicate relative to a false candidate (candidates are verified exactly, so misses weigh more)
+LSH_FALSE_NEGATIVE_WEIGHT = 0.9
+# Lowest share of the matches at a similarity the index must find to be used for it (lower: scan everything)
+LSH_MIN_RECALL = 0.99
+
+# Universal hashing (a * x + b) mod p with a Mersenne prime; signatures keep the low 32 bits
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed so that stored signatures stay comparable across restarts
+_SEED = 1
+
+
+def prompt_tokens(text: str) -> Set[str]:
+    """Words of a prompt, compared case-insensitively (the same sets find_reusable compares)"""
+    return set(text.lower().split())
+
+
+def optimal_bands(threshold: float, num_perm: int,
+                  false_negative_weight: float = LSH_FALSE_NEGATIVE_WEIGHT) -> Tuple[int, int]:
+    """
+    Split a signature into bands for LSH
+
+    Two items share a bucket with probability 1 - (1 - s^rows)^bands for a Jaccard
+    similarity s; this picks the split minimizing the weighted false positives below
+    the threshold plus the false negatives above it.
+
+    Returns:
+        (bands, rows per band)
+    """
+    similarities = np.linspace(0.0, 1.0, 201)
+    below, above = similarities < threshold, similarities >= threshold
+    best, best_error = (1, num_perm), float('inf')
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        collision = 1 - (1 - similarities ** rows) ** bands
+        false_positives = collision[below].mean() * threshold if below.any() else 0.0
+        false_negatives = (1 - collision[above]).mean() * (1 - threshold) if above.any() else 0.0
+        error = (1 - false_negative_weight) * false_positives + false_negative_weight * false_negatives
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class MinHasher:
+    """Computes MinHash signatures of token sets (estimating their Jaccard similarity)"""
+
+    def __init__(self, num_perm: int = MINHASH_PERMUTATIONS, seed: int = _SEED):
+        self.num_perm = num_perm
+        rng = np.random.RandomState(seed)
+        # Below 2^32 so that a * x + b cannot overflow 64 bits for 32-bit token hashes
+        self._a = rng.randint(1, 1 << 32, num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, num_perm, dtype=np.uint64)
+
+    def signature(self, tokens: Iterable[str]) -> np.ndarray:
+        """Return the uint32 signature of a token set (all maximal for an empty set)"""
+        hashes = np.array([int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), 'little')
+                           for token in set(tokens)], dtype=np.uint64)
+        if not hashes.size:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the sets behind two signatures"""
+        return float(np.mean(first == second))
+
+    @staticmethod
+    def to_blob(signature: np.ndarray) -> bytes:
+        return np.asarray(signature, dtype='<u4').tobytes()
+
+    @staticmethod
+    def from_blob(blob: bytes) -> np.ndarray:
+        return np.frombuffer(blob, dtype='<u4')
+
+
+class LSHIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures
+
+    Each signature is cut into bands; items whose signatures agree on a whole band
+    land in the same bucket, so near-duplicates are found with one dictionary lookup
+    per band instead of a comparison with every item.
+    """
+
+    def __init__(self, num_perm: int = MINHASH_PERMUTATIONS, threshold: float = LSH_THRESHOLD):
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(self.bands)]
+        self._keys: Dict[str, List[bytes]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def recall(self, similarity: float) -> float:
+        """Probability that an item with this Jaccard similarity to a query is among its candidates"""
+        return 1 - (1 - similarity ** self.rows) ** self.bands
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        if len(signature) != self.num_perm:
+            raise ValueError(f"Signature has {len(signature)} values, index expects {self.num_perm}")
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, item_id: str, signature: np.ndarray) -> None:
+        """Insert or replace the signature of an item"""
+        keys = self._band_keys(signature)
+        with self._lock:
+            self._remove(item_id)
+            for buckets, key in zip(self._buckets, keys):
+                buckets.setdefault(key, set()).add(item_id)
+            self._keys[item_id] = keys
+
+    def remove(self, item_id: str) -> bool:
+        """Remove an item"""
+        with self._lock:
+            return self._remove(item_id)
+
+    def _remove(self, item_id: str) -> bool:
+        keys = self._keys.pop(item_id, None)
+        if keys is None:
+            return False
+        for buckets, key in zip(self._buckets, keys):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del buckets[key]
+        return True
+
+    def candidates(self, signature: np.ndarray) -> Set[str]:
+        """Items sharing at least one bucket with the signature"""
+        keys = self._band_keys(signature)
+        found: Set[str] = set()
+        with self._lock:
+            for buckets, key in zip(self._buckets, keys):
+                bucket = buckets.get(key)
+                if bucket:
+                    found.update(bucket)
+        return found
+
+
+# Global MinHash instance
+minhasher = MinHasher()
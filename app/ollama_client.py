@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.cancellation import CancellationToken
+
+
+class OllamaClient:
+    """
+    Shared client for the Ollama server
+    
+    Features:
+    - Pooled keep-alive HTTP session reused by every call
+    - Configurable base URL (OLLAMA_BASE_URL)
+    - keep_alive sent with every request so the model stays loaded (OLLAMA_KEEP_ALIVE)
+    - Streaming generation with early stop, token limits and stop sequences
+    - Cancellable generation that returns as soon as the token is cancelled
+    - Embeddings of texts (used for memory similarity)
+    - Warm-up request to load the model at startup
+    """
+    
+    def __init__(self,
+                 base_url: str = os.environ.get('OLLAMA_BASE_URL', 'http://ollama:11434'),
+                 keep_alive: str = os.environ.get('OLLAMA_KEEP_ALIVE', '30m'),
+                 pool_size: int = int(os.environ.get('OLLAMA_POOL_SIZE', 8))):
+        self.base_url = base_url.rstrip('/')
+        self.keep_alive = keep_alive
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Runs cancellable generations, so that the caller can stop waiting on them at any time
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="ollama")
+    
+    def generate(self,
+                 model: str,
+                 prompt: str,
+                 timeout: float = 60,
+                 max_words: Optional[int] = None,
+                 stop: Optional[List[str]] = None,
+                 on_text: Optional[Callable[[str], None]] = None,
+                 format: Optional[str] = None,
+                 num_predict: Optional[int] = None,
+                 stop_sequences: Optional[List[str]] = None,
+                 cancel_token: Optional[CancellationToken] = None) -> str:
+        """
+        Stream a completion from Ollama and stop reading as soon as it is long enough
+        
+        Args:
+            model: Ollama model name
+            prompt: Full prompt sent to the model
+            timeout: Seconds to wait for the connection and for each streamed chunk
+            max_words: Stop once the answer has more than this many words
+            stop: Stop at the first occurrence of any of these delimiters (not included),
+                ignoring leading whitespace
+            on_text: Called with the text generated so far after every chunk
+            format: Output format enforced by Ollama (e.g. "json"); do not combine with max_words or stop
+            num_predict: Maximum number of tokens Ollama generates
+            stop_sequences: Stop sequences applied by Ollama itself
+            cancel_token: Cancelling it returns at once, even before Ollama answered, and shuts the
+                stream down, which makes Ollama stop generating
+            
+        Returns:
+            The generated text, stripped. Closing the request early makes Ollama stop generating.
+            
+        Raises:
+            OperationCancelledError: If cancel_token was cancelled before the answer was complete
+        """
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        
+        options: Dict[str, Any] = {}
+        if num_predict:
+            options["num_predict"] = num_predict
+        if stop_sequences:
+            options["stop"] = stop_sequences
+        
+        payload = {
+            "model": model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive
+        }
+        if format:
+            payload["format"] = format
+        if options:
+            payload["options"] = options
+        
+        if not cancel_token:
+            return self._stream(payload, timeout, max_words, stop, on_text)
+        
+        # The request runs on a worker: no blocking call (connecting, waiting for the headers
+        # while the model loads, reading a stalled stream) can delay the cancellation
+        future = self._executor.submit(self._stream, payload, timeout, max_words, stop, on_text, cancel_token)
+        finished = threading.Event()
+        future.add_done_callback(lambda _: finished.set())
+        unregister = cancel_token.add_callback(finished.set)
+        finished.wait()
+        unregister()
+        
+        if cancel_token.cancelled:
+            # A queued request is dropped; a sent one ends when its headers arrive (the stream
+            # is then shut down) or when it times out
+            future.cancel()
+            cancel_token.raise_if_cancelled()
+        return future.result()
+    
+    def _stream(self,
+                payload: Dict[str, Any],
+                timeout: float,
+                max_words: Optional[int],
+                stop: Optional[List[str]],
+                on_text: Optional[Callable[[str], None]],
+                cancel_token: Optional[CancellationToken] = None) -> str:
+        """Send a generation request and read its streamed answer"""
+        with self.session.post(f"{self.base_url}/api/generate", json=payload, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            unregister = cancel_token.add_callback(lambda: self._abort(response)) if cancel_token else None
+            try:
+                return self._read_stream(response, max_words, stop, on_text).strip()
+            finally:
+                if unregister:
+                    unregister()
+    
+    @staticmethod
+    def _abort(response: requests.Response) -> None:
+        """Shut a streamed response down from another thread (closing alone does not wake a blocked read)"""
+        sock = getattr(getattr(response.raw, '_connection', None), 'sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        response.close()
+    
+    def _read_stream(self,
+                     response: requests.Response,
+                     max_words: Optional[int],
+                     stop: Optional[List[str]],
+                     on_text: Optional[Callable[[str], None]]) -> str:
+        """Accumulate a streamed answer until it is done, a stop delimiter appears or max_words is reached"""
+        text = ""
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise Exception(f"Ollama error: {chunk['error']}")
+            
+            text += chunk.get("response", "")
+            
+            # Cut at the first stop delimiter, ignoring leading whitespace
+            if stop:
+                start = len(text) - len(text.lstrip())
+                positions = [p for p in (text.find(s, start) for s in stop) if p > start]
+                if positions:
+                    text = text[:min(positions)]
+                    if on_text:
+                        on_text(text)
+                    logging.info("Ollama generation stopped at delimiter")
+                    break
+            
+            if on_text:
+                on_text(text)
+            
+            # More than max_words words means the last wanted word is complete
+            if max_words and len(text.split()) > max_words:
+                text = " ".join(text.split()[:max_words])
+                logging.info(f"Ollama generation stopped after {max_words} words")
+                break
+            
+            if chunk.get("done"):
+                break
+        
+        return text
+    
+    def embed(self, model: str, text: str, timeout: float = 30) -> List[float]:
+        """Return the embedding of a text from Ollama's embeddings endpoint"""
+        response = self.session.post(f"{self.base_url}/api/embeddings", json={
+            "model": model,
+            "prompt": text,
+            "keep_alive": self.keep_alive
+        }, timeout=timeout)
+        response.raise_for_status()
+        embedding = response.json().get("embedding")
+        if not embedding:
+            raise Exception(f"Ollama returned no embedding for model '{model}'")
+        return embedding
+    
+    def warm_up(self, model: str = "llama3", timeout: float = 600) -> bool:
+        """Load the model into memory (an empty prompt only loads it) and keep it resident"""
+        try:
+            response = self.session.post(f"{self.base_url}/api/generate", json={
+                "model": model,
+                "keep_alive": self.keep_alive
+            }, timeout=timeout)
+            response.raise_for_status()
+            logging.info(f"Ollama model '{model}' loaded (keep_alive: {self.keep_alive})")
+            return True
+        except Exception as e:
+            logging.error(f"Ollama warm-up failed: {e}")
+            return False
+
+# Global Ollama client instance
+ollama = OllamaClient()
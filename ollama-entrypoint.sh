@@ -1,5 +1,6 @@
 #!/bin/sh
 ollama serve &
 sleep 3
+ollama pull nomic-embed-text
 ollama run llama3
 tail -f /dev/null